@@ -0,0 +1,29 @@
+'''
+Selección del backend de GestionProductos.
+    - "mysql": gestion_productos.GestionProductos, configurado desde .env
+    - "json": desafio1.gestion_productos.GestionProductos sobre un archivo JSON
+Los módulos se importan recién al elegir el backend, así el backend JSON no
+necesita el conector de MySQL. Con instrumentar=True la instancia se mide con
+instrumentacion.instrumentar(), y con traza=ARCHIVO sus llamadas se graban
+con trazas.grabar().
+'''
+
+BACKENDS = ('mysql', 'json')
+
+
+def crear_gestion(backend='mysql', archivo='productos_db.json', instrumentar=False, traza=None):
+    if backend == 'mysql':
+        from gestion_productos import GestionProductos
+        gestion = GestionProductos()
+    elif backend == 'json':
+        from desafio1.gestion_productos import GestionProductos
+        gestion = GestionProductos(archivo)
+    else:
+        raise ValueError(f'Backend desconocido: {backend}')
+    if instrumentar:
+        from instrumentacion import instrumentar as instrumentar_gestion
+        gestion = instrumentar_gestion(gestion)
+    if traza:
+        from trazas import grabar
+        gestion = grabar(gestion, traza)
+    return gestion
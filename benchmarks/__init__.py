@@ -0,0 +1,12 @@
+'''
+Benchmarks de GestionProductos.
+
+    python -m benchmarks --backend json --escala 1k --salida resultados.json
+    python -m benchmarks --backend json --escala 1k --base resultados.json
+
+Ver benchmarks/__main__.py para todas las opciones. Para reproducir trazas
+grabadas con trazas.grabar() ver benchmarks/carga.py.
+'''
+from benchmarks.catalogo import ESCALAS, generar_catalogo
+from benchmarks.comparacion import comparar
+from benchmarks.medicion import medir
@@ -0,0 +1,179 @@
+'''
+Ejecuta los benchmarks sobre uno o más backends y escalas.
+
+    python -m benchmarks --backend json mysql --escala 1k 100k \
+        --operaciones 1000 --salida resultados.json --base base.json
+
+Por cada backend y escala se carga un catálogo sintético con procesar_lote y
+se miden: carga_masiva, recorrido, leer, buscar, actualizar, crear y
+eliminar. Al terminar se eliminan los productos cargados. Cada combinación
+se corre --calentamiento veces sin medir y luego --repeticiones veces; se
+informa la mediana de cada métrica. ops/s cuenta llamadas; carga_masiva y
+recorrido informan además filas/s. Cada corrida se ejecuta en un proceso
+nuevo, así rss_max_kb es el pico de ese backend y escala y no el de una
+escala anterior. El catálogo se genera de a un lote por vez.
+El backend MySQL se configura desde .env y solo se acepta un servidor local.
+Si se indica --base, el programa termina con código 1 cuando hay regresiones.
+'''
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+from backends import BACKENDS, crear_gestion
+from benchmarks.catalogo import CODIGO_INICIAL, ESCALAS, PROVEEDORES, generar_catalogo
+from benchmarks.comparacion import comparar
+from benchmarks.medicion import medianas, medir
+
+HOSTS_LOCALES = ('localhost', '127.0.0.1', '::1')
+CODIGO_MAXIMO_JSON = 999999
+
+
+def lotes(elementos, tamanio):
+    elementos = iter(elementos)
+    while True:
+        lote = list(islice(elementos, tamanio))
+        if not lote:
+            return
+        yield lote
+
+
+def ejecutar_backend(backend, escala, operaciones, tamanio_lote, semilla, directorio):
+    cantidad = ESCALAS[escala]
+    if backend == 'json' and CODIGO_INICIAL + cantidad + operaciones > CODIGO_MAXIMO_JSON:
+        print(f'Se omite json/{escala}: el backend JSON solo admite códigos '
+              'de 6 dígitos', file=sys.stderr)
+        return []
+
+    gestion = crear_gestion(backend, os.path.join(directorio, f'bench_{escala}.json'))
+    if backend == 'mysql' and gestion.host not in HOSTS_LOCALES:
+        raise SystemExit(
+            f'Los benchmarks de MySQL deben correr contra un servidor local, no {gestion.host}')
+    rng = random.Random(semilla + 1)
+
+    codigos = []
+    creados = []
+
+    def cargar(lote):
+        for resultado in gestion.procesar_lote(lote):
+            if resultado['ok']:
+                codigos.append(resultado['codigo'])
+
+    def crear(producto_data):
+        resultado, = gestion.procesar_lote([{'op': 'crear', 'producto': producto_data}])
+        if resultado['ok']:
+            creados.append(resultado['codigo'])
+
+    catalogo = ({'op': 'crear', 'producto': producto}
+                for producto in generar_catalogo(cantidad, semilla))
+    resultados = [medir('carga_masiva', cargar,
+                        ((lote,) for lote in lotes(catalogo, tamanio_lote)), filas=cantidad)]
+    if not codigos:
+        raise SystemExit(f'No se pudo cargar el catálogo en {backend}')
+
+    muestra = [rng.choice(codigos) for _ in range(operaciones)]
+    resultados.append(medir('recorrido', gestion.buscar_productos,
+                            [('', cantidad)] * 10, filas=10 * cantidad))
+    resultados.append(medir('leer', gestion.leer_producto,
+                            [(codigo,) for codigo in muestra]))
+    resultados.append(medir('buscar', gestion.buscar_productos,
+                            [(rng.choice(PROVEEDORES), 100) for _ in range(operaciones)]))
+    resultados.append(medir('actualizar', gestion.actualizar_producto,
+                            [(codigo, round(rng.uniform(1, 10000), 2)) for codigo in muestra]))
+
+    nuevos = generar_catalogo(operaciones, semilla + 2,
+                              codigo_inicial=CODIGO_INICIAL + cantidad)
+    resultados.append(medir('crear', crear, [(producto,) for producto in nuevos]))
+    resultados.append(medir('eliminar', gestion.eliminar_producto,
+                            [(codigo,) for codigo in creados]))
+
+    for lote in lotes(codigos, tamanio_lote):
+        gestion.procesar_lote([{'op': 'eliminar', 'codigo': codigo} for codigo in lote])
+
+    for resultado in resultados:
+        resultado['backend'] = backend
+        resultado['escala'] = escala
+    return resultados
+
+
+def ejecutar_en_proceso(*args):
+    '''ejecutar_backend() en un proceso propio, para medir su memoria por separado'''
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(ejecutar_backend, *args).result()
+
+
+def mostrar_resultados(resultados, salida=sys.stderr):
+    print(f"{'backend':8} {'escala':6} {'benchmark':13} {'ops/s':>12} "
+          f"{'filas/s':>12} {'p50 ms':>10} {'p99 ms':>10}", file=salida)
+    for resultado in resultados:
+        filas = f"{resultado['filas_s']:>12.1f}" if 'filas_s' in resultado else f"{'':>12}"
+        print(f"{resultado['backend']:8} {resultado['escala']:6} "
+              f"{resultado['benchmark']:13} {resultado['ops_s']:>12.1f} {filas} "
+              f"{resultado['p50_ms']:>10.3f} {resultado['p99_ms']:>10.3f}", file=salida)
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks', description='Benchmarks de GestionProductos')
+    parser.add_argument('--backend', nargs='+', choices=BACKENDS, default=['json'])
+    parser.add_argument('--escala', nargs='+', choices=ESCALAS, default=['1k'])
+    parser.add_argument('--operaciones', type=int, default=1000,
+                        help='operaciones por benchmark individual')
+    parser.add_argument('--tamanio-lote', type=int, default=1000)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', help='archivo JSON de resultados (por defecto stdout)')
+    parser.add_argument('--base', help='archivo JSON de una corrida anterior')
+    parser.add_argument('--calentamiento', type=int, default=1,
+                        help='corridas descartadas antes de medir')
+    parser.add_argument('--repeticiones', type=int, default=5,
+                        help='corridas medidas; se informa la mediana')
+    parser.add_argument('--tolerancia', type=float, default=0.25)
+    args = parser.parse_args(argumentos)
+    if args.repeticiones < 1:
+        parser.error('--repeticiones debe ser mayor a cero')
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for backend in args.backend:
+            for escala in args.escala:
+                corridas = [ejecutar_en_proceso(backend, escala, args.operaciones,
+                                                args.tamanio_lote, args.semilla, directorio)
+                            for _ in range(args.calentamiento + args.repeticiones)]
+                resultados += medianas(corridas[args.calentamiento:])
+    mostrar_resultados(resultados)
+
+    informe = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'semilla': args.semilla,
+        'operaciones': args.operaciones,
+        'repeticiones': args.repeticiones,
+        'resultados': resultados,
+    }
+    if args.base:
+        with open(args.base, 'r', encoding='utf-8') as archivo:
+            base = json.load(archivo)['resultados']
+        informe['regresiones'] = comparar(resultados, base, args.tolerancia)
+        for regresion in informe['regresiones']:
+            print(f"Regresión en {regresion['backend']}/{regresion['escala']}/"
+                  f"{regresion['benchmark']}: {regresion['metrica']} "
+                  f"{regresion['base']} -> {regresion['actual']}", file=sys.stderr)
+
+    texto = json.dumps(informe, indent=4, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            archivo.write(texto)
+    else:
+        print(texto)
+    return 1 if informe.get('regresiones') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
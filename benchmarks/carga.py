@@ -0,0 +1,373 @@
+'''
+Reproducción de trazas grabadas con trazas.grabar() contra cualquier backend.
+
+    python -m benchmarks.carga traza.jsonl.gz --backend json --archivo datos.json \
+        --modo hilos --concurrencia 8 [--ritmo 500 | --ritmo original]
+
+La reproducción modifica los datos: con el backend json --archivo es
+obligatorio, para no usar por accidente productos_db.json.
+
+Las llamadas se reparten en forma circular entre `concurrencia` hilos,
+procesos o tareas de asyncio.
+    - Lazo cerrado (sin --ritmo): cada trabajador ejecuta su siguiente llamada
+      apenas termina la anterior.
+    - Lazo abierto (--ritmo N): la llamada i llega en i / N segundos, o en su
+      instante original con --ritmo original. La latencia se mide desde la
+      llegada programada, así que incluye la espera si el backend se atrasa.
+
+El informe incluye histogramas de latencia por método, throughput, errores y
+síntomas de contención:
+    - actualizaciones_perdidas: unidades de stock aplicadas con ajustar_stock
+      que no se reflejan en el estado final (escrituras pisadas en JSON)
+    - lecturas_corruptas: lecturas del archivo JSON mientras otro trabajador
+      lo estaba reescribiendo
+    - conexiones_fallidas: llamadas que no pudieron abrir una conexión
+      (por ejemplo "Too many connections" en MySQL)
+Los métodos CRUD informan sus errores por pantalla, por eso se captura la
+salida de cada llamada para clasificarlos. Si no se puede leer el stock antes
+o después de reproducir, actualizaciones_perdidas queda en null.
+
+Limitación: MySQL asigna el código al crear, así que los crear_producto de una
+traza grabada sobre MySQL no tienen "codigo" y fallan al reproducirse sobre el
+backend JSON. Esos errores se cuentan además en creaciones_sin_codigo.
+'''
+import argparse
+import asyncio
+import importlib
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from backends import BACKENDS, crear_gestion
+from benchmarks.medicion import percentil
+from instrumentacion import LIMITES, Histograma
+from trazas import leer_traza
+
+MODOS = ('hilos', 'procesos', 'asyncio')
+ESPERA_INICIAL = 0.5
+
+
+class SalidaPorHilo:
+    '''Reemplazo de sys.stdout que guarda lo impreso por cada hilo por separado'''
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def capturar(self):
+        self._local.partes = []
+
+    def obtener(self):
+        return ''.join(getattr(self._local, 'partes', []))
+
+    def write(self, texto):
+        partes = getattr(self._local, 'partes', None)
+        if partes is not None:
+            partes.append(texto)
+        return len(texto)
+
+    def flush(self):
+        pass
+
+
+class Parcial:
+    '''Resultados de un trabajador'''
+
+    def __init__(self):
+        self.latencias = {}
+        self.errores = {}
+        self.conexiones_fallidas = 0
+        self.lecturas_corruptas = 0
+        self.creaciones_sin_codigo = 0
+        self.stock_aplicado = {}
+
+    def unir(self, otro):
+        for metodo, latencias in otro.latencias.items():
+            self.latencias.setdefault(metodo, []).extend(latencias)
+        for metodo, errores in otro.errores.items():
+            self.errores[metodo] = self.errores.get(metodo, 0) + errores
+        self.conexiones_fallidas += otro.conexiones_fallidas
+        self.lecturas_corruptas += otro.lecturas_corruptas
+        self.creaciones_sin_codigo += otro.creaciones_sin_codigo
+        for codigo, diferencia in otro.stock_aplicado.items():
+            self.stock_aplicado[codigo] = self.stock_aplicado.get(codigo, 0) + diferencia
+
+
+def argumento(args, kwargs, posicion, nombre):
+    '''Valor de un argumento grabado en forma posicional o por nombre'''
+    return args[posicion] if len(args) > posicion else kwargs[nombre]
+
+
+def codigos_con_stock(llamadas):
+    codigos = set()
+    for _, metodo, args, kwargs in llamadas:
+        if metodo == 'ajustar_stock':
+            codigos.add(str(argumento(args, kwargs, 0, 'codigo_producto')))
+        elif metodo == 'procesar_lote':
+            codigos.update(str(operacion.get('codigo'))
+                           for operacion in argumento(args, kwargs, 0, 'operaciones')
+                           if operacion.get('op') == 'ajustar_stock')
+    return codigos
+
+
+def cantidades(gestion, codigos):
+    return {codigo: int(datos['cantidad'])
+            for codigo, datos in gestion.leer_productos(codigos).items()}
+
+
+def cantidades_o_nada(gestion, codigos, parcial):
+    '''
+    Como cantidades(), pero si no se pudo leer el stock (por ejemplo, sin
+    conexión a MySQL) devuelve None y cuenta la conexión fallida. Lo que
+    imprime el backend va a stderr para no mezclarse con el informe.
+    '''
+    salida = SalidaPorHilo()
+    salida.capturar()
+    salida_original, sys.stdout = sys.stdout, salida
+    try:
+        resultado = cantidades(gestion, codigos)
+    except Exception as e:
+        salida.write(f'Error: {e}\n')
+        resultado = None
+    finally:
+        sys.stdout = salida_original
+    texto = salida.obtener()
+    if texto:
+        print(texto, end='', file=sys.stderr)
+    if resultado is None or 'Error al conectar' in texto:
+        parcial.conexiones_fallidas += 1
+        print('No se pudo leer el stock: no se informan actualizaciones perdidas',
+              file=sys.stderr)
+        return None
+    return resultado
+
+
+def ejecutar_llamada(gestion, fabrica, salida, parcial, metodo, args, kwargs):
+    salida.capturar()
+    error = conexion_fallida = sin_codigo = False
+    try:
+        if metodo == 'crear_producto':
+            datos = argumento(args, kwargs, 0, 'producto')
+            sin_codigo = 'codigo' not in datos
+            producto = fabrica(datos)
+            if args:
+                args = [producto] + list(args[1:])
+            else:
+                kwargs = dict(kwargs, producto=producto)
+        resultado = getattr(gestion, metodo)(*args, **kwargs)
+    except Exception as e:
+        resultado, error = None, True
+        salida.write(f'Error: {e}')
+        conexion_fallida = isinstance(e, ConnectionError)
+    texto = salida.obtener()
+
+    if 'Error al conectar' in texto:
+        conexion_fallida = True
+    if 'Error al decodificar JSON' in texto:
+        parcial.lecturas_corruptas += 1
+    if 'Error' in texto:
+        error = True
+    if metodo == 'ajustar_stock' and not error and 'Stock actualizado' in texto:
+        codigo = str(argumento(args, kwargs, 0, 'codigo_producto'))
+        parcial.stock_aplicado[codigo] = parcial.stock_aplicado.get(codigo, 0) + \
+            int(argumento(args, kwargs, 1, 'diferencia'))
+    elif metodo == 'procesar_lote' and resultado:
+        for operacion, detalle in zip(argumento(args, kwargs, 0, 'operaciones'), resultado):
+            if not detalle['ok']:
+                error = True
+                if 'Sin conexión' in detalle['error']:
+                    conexion_fallida = True
+            elif operacion.get('op') == 'ajustar_stock':
+                codigo = str(operacion['codigo'])
+                parcial.stock_aplicado[codigo] = parcial.stock_aplicado.get(codigo, 0) + \
+                    int(operacion['diferencia'])
+    # Una llamada cuenta como una sola conexión fallida aunque el error se vea varias veces
+    if conexion_fallida:
+        parcial.conexiones_fallidas += 1
+    if error:
+        parcial.errores[metodo] = parcial.errores.get(metodo, 0) + 1
+        if sin_codigo:
+            parcial.creaciones_sin_codigo += 1
+
+
+def reproducir_particion(gestion, salida, llamadas, inicio):
+    '''
+    Ejecuta `llamadas` en orden. Cada llamada es (llegada, método, args, kwargs);
+    llegada es None en lazo cerrado o el instante (time.time()) programado.
+    '''
+    fabrica = importlib.import_module(type(gestion).__module__).producto_desde_dict
+    parcial = Parcial()
+    for llegada, metodo, args, kwargs in llamadas:
+        if llegada is None:
+            comienzo = time.time()
+        else:
+            comienzo = inicio + llegada
+            espera = comienzo - time.time()
+            if espera > 0:
+                time.sleep(espera)
+        ejecutar_llamada(gestion, fabrica, salida, parcial, metodo, args, kwargs)
+        parcial.latencias.setdefault(metodo, []).append(time.time() - comienzo)
+    return parcial
+
+
+def _reproducir_en_proceso(backend, archivo, llamadas, inicio):
+    salida = SalidaPorHilo()
+    sys.stdout = salida
+    return reproducir_particion(crear_gestion(backend, archivo), salida, llamadas, inicio)
+
+
+async def _reproducir_asyncio(gestion, salida, particiones, inicio):
+    loop = asyncio.get_running_loop()
+    fabrica = importlib.import_module(type(gestion).__module__).producto_desde_dict
+    with ThreadPoolExecutor(max_workers=len(particiones)) as executor:
+
+        async def tarea(llamadas):
+            parcial = Parcial()
+            for llegada, metodo, args, kwargs in llamadas:
+                if llegada is None:
+                    comienzo = time.time()
+                else:
+                    comienzo = inicio + llegada
+                    await asyncio.sleep(max(0.0, comienzo - time.time()))
+                await loop.run_in_executor(executor, ejecutar_llamada, gestion, fabrica,
+                                           salida, parcial, metodo, args, kwargs)
+                parcial.latencias.setdefault(metodo, []).append(time.time() - comienzo)
+            return parcial
+
+        return await asyncio.gather(*(tarea(llamadas) for llamadas in particiones))
+
+
+def programar(llamadas, ritmo):
+    '''Asigna a cada llamada su llegada relativa según el ritmo pedido'''
+    if ritmo is None:
+        return [(None, metodo, args, kwargs) for _, metodo, args, kwargs in llamadas]
+    if ritmo == 'original':
+        primera = llamadas[0][0] if llamadas else 0.0
+        return [(segundos - primera, metodo, args, kwargs)
+                for segundos, metodo, args, kwargs in llamadas]
+    return [(indice / ritmo, metodo, args, kwargs)
+            for indice, (_, metodo, args, kwargs) in enumerate(llamadas)]
+
+
+def reproducir(llamadas, backend, archivo, modo='hilos', concurrencia=1, ritmo=None):
+    gestion = crear_gestion(backend, archivo)
+    codigos = codigos_con_stock(llamadas)
+    lecturas_stock = Parcial()
+    iniciales = cantidades_o_nada(gestion, codigos, lecturas_stock)
+
+    programadas = programar(llamadas, ritmo)
+    particiones = [programadas[posicion::concurrencia] for posicion in range(concurrencia)]
+    salida_original, salida = sys.stdout, SalidaPorHilo()
+    sys.stdout = salida
+    try:
+        inicio = time.time() + (ESPERA_INICIAL if ritmo is not None else 0.0)
+        if modo == 'procesos':
+            with ProcessPoolExecutor(max_workers=concurrencia) as executor:
+                parciales = list(executor.map(
+                    _reproducir_en_proceso, [backend] * concurrencia,
+                    [archivo] * concurrencia, particiones, [inicio] * concurrencia))
+        elif modo == 'asyncio':
+            parciales = asyncio.run(_reproducir_asyncio(gestion, salida, particiones, inicio))
+        else:
+            with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+                parciales = list(executor.map(
+                    lambda llamadas: reproducir_particion(gestion, salida, llamadas, inicio),
+                    particiones))
+        duracion = time.time() - inicio
+    finally:
+        sys.stdout = salida_original
+
+    total = Parcial()
+    for parcial in parciales:
+        total.unir(parcial)
+    finales = cantidades_o_nada(gestion, codigos, lecturas_stock) if iniciales is not None else None
+    total.unir(lecturas_stock)
+    return informe(total, duracion, iniciales, finales, modo, concurrencia, ritmo)
+
+
+def informe(total, duracion, iniciales, finales, modo, concurrencia, ritmo):
+    metodos = {}
+    for metodo, latencias in sorted(total.latencias.items()):
+        histograma = Histograma()
+        for segundos in latencias:
+            histograma.observar(segundos)
+        latencias.sort()
+        metodos[metodo] = {
+            'llamadas': len(latencias),
+            'errores': total.errores.get(metodo, 0),
+            'p50_ms': round(percentil(latencias, 50) * 1000, 4),
+            'p90_ms': round(percentil(latencias, 90) * 1000, 4),
+            'p99_ms': round(percentil(latencias, 99) * 1000, 4),
+            'max_ms': round(latencias[-1] * 1000, 4),
+            'histograma': {('+Inf' if limite == float('inf') else str(limite)): cuenta
+                           for limite, cuenta in zip(LIMITES, histograma.acumuladas())},
+        }
+
+    perdidas = None
+    if iniciales is not None and finales is not None:
+        perdidas = 0
+        for codigo, inicial in iniciales.items():
+            if codigo in finales:
+                esperado = inicial + total.stock_aplicado.get(codigo, 0)
+                perdidas += abs(esperado - finales[codigo])
+
+    llamadas = sum(datos['llamadas'] for datos in metodos.values())
+    errores = sum(datos['errores'] for datos in metodos.values())
+    return {
+        'modo': modo,
+        'concurrencia': concurrencia,
+        'ritmo': ritmo if ritmo is not None else 'lazo cerrado',
+        'llamadas': llamadas,
+        'segundos': round(duracion, 3),
+        'llamadas_s': round(llamadas / duracion, 2) if duracion > 0 else 0.0,
+        'errores': errores,
+        'tasa_errores': round(errores / llamadas, 4) if llamadas else 0.0,
+        'actualizaciones_perdidas': perdidas,
+        'lecturas_corruptas': total.lecturas_corruptas,
+        'conexiones_fallidas': total.conexiones_fallidas,
+        'creaciones_sin_codigo': total.creaciones_sin_codigo,
+        'metodos': metodos,
+    }
+
+
+def leer_ritmo(valor):
+    return valor if valor == 'original' else float(valor)
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.carga', description='Reproduce una traza de GestionProductos')
+    parser.add_argument('traza')
+    parser.add_argument('--backend', choices=BACKENDS, default='json')
+    parser.add_argument('--archivo', help='archivo de datos del backend json (obligatorio con json)')
+    parser.add_argument('--modo', choices=MODOS, default='hilos')
+    parser.add_argument('--concurrencia', type=int, default=1)
+    parser.add_argument('--ritmo', type=leer_ritmo,
+                        help='llamadas por segundo, u "original"; sin valor es lazo cerrado')
+    parser.add_argument('--salida', help='archivo JSON del informe (por defecto stdout)')
+    args = parser.parse_args(argumentos)
+    if args.concurrencia < 1:
+        parser.error('--concurrencia debe ser mayor a cero')
+    if args.ritmo not in (None, 'original') and not args.ritmo > 0:
+        parser.error('--ritmo debe ser mayor a cero')
+    if args.backend == 'json' and not args.archivo:
+        parser.error('--archivo es obligatorio con el backend json')
+
+    resultado = reproducir(leer_traza(args.traza), args.backend, args.archivo,
+                           args.modo, args.concurrencia, args.ritmo)
+    texto = json.dumps(resultado, indent=4, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            archivo.write(texto)
+    else:
+        print(texto)
+    print(f"{resultado['llamadas']} llamadas en {resultado['segundos']} s "
+          f"({resultado['llamadas_s']} llamadas/s) - errores: {resultado['errores']} - "
+          f"actualizaciones perdidas: {resultado['actualizaciones_perdidas']} - "
+          f"lecturas corruptas: {resultado['lecturas_corruptas']} - "
+          f"conexiones fallidas: {resultado['conexiones_fallidas']}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+'''
+Generador determinista de catálogos sintéticos.
+
+Con la misma semilla y la misma fecha base se obtiene siempre el mismo
+catálogo. Los proveedores siguen una distribución sesgada (pocos proveedores
+concentran la mayoría de los productos) y las fechas de vencimiento son
+siempre posteriores a la fecha base, como exige ProductoAlimenticio.
+'''
+import random
+from datetime import date, timedelta
+
+ESCALAS = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+
+CODIGO_INICIAL = 100000
+
+PROVEEDORES = [
+    'Arcor', 'Bimbo', 'La Serenísima', 'Molinos', 'Mastellone', 'Ledesma',
+    'Quilmes', 'Danone', 'Nestlé', 'Unilever', 'Lenovo', 'Samsung', 'Philips',
+    'BGH', 'Noblex', 'Motorola', 'HP', 'Dell', 'Sony', 'LG', 'Atma', 'Liliana',
+    'Peabody', 'Drean', 'Gafa', 'Patagonia', 'Felfort', 'Bagley', 'Terrabusi',
+    'Georgalos', 'Havanna', 'Cachafaz', 'Rapanui', 'Mamuschka', 'Sancor',
+    'Paladini', 'Granja del Sol', 'Swift', 'Knorr', 'Lucchetti', 'Marolio',
+    'Cañuelas', 'Pureza', 'Blancaflor', 'Exquisita', 'Taragüi', 'Playadito',
+    'CBSé', 'Rosamonte', 'Amanda',
+]
+
+ALIMENTOS = ['Pan', 'Leche', 'Yogur', 'Queso', 'Fideos', 'Arroz', 'Galletitas',
+             'Yerba', 'Harina', 'Aceite', 'Azúcar', 'Mermelada', 'Dulce de leche']
+ELECTRONICOS = ['Computadora', 'Notebook', 'Monitor', 'Celular', 'Tablet',
+                'Televisor', 'Auriculares', 'Parlante', 'Microondas', 'Heladera']
+GENERALES = ['Mate', 'Termo', 'Bombilla', 'Cuaderno', 'Lapicera', 'Mochila']
+
+
+def pesos_proveedores(sesgo=1.1):
+    '''Pesos acumulados tipo Zipf: el proveedor k tiene peso 1 / k^sesgo'''
+    acumulado, pesos = 0.0, []
+    for posicion in range(1, len(PROVEEDORES) + 1):
+        acumulado += 1 / posicion ** sesgo
+        pesos.append(acumulado)
+    return pesos
+
+
+def generar_catalogo(cantidad, semilla=42, fecha_base=None, codigo_inicial=CODIGO_INICIAL):
+    '''
+    Genera `cantidad` productos como diccionarios en el formato de to_dict():
+    40% alimenticios, 35% electrónicos y 25% productos generales.
+    '''
+    rng = random.Random(semilla)
+    fecha_base = fecha_base or date.today()
+    pesos = pesos_proveedores()
+    for indice in range(cantidad):
+        tipo = rng.random()
+        if tipo < 0.40:
+            nombre = rng.choice(ALIMENTOS)
+        elif tipo < 0.75:
+            nombre = rng.choice(ELECTRONICOS)
+        else:
+            nombre = rng.choice(GENERALES)
+        producto = {
+            "codigo": codigo_inicial + indice,
+            "nombre": f'{nombre} {indice}',
+            "precio": round(rng.lognormvariate(7, 1.2), 2),
+            "cantidad": rng.randint(0, 500),
+            "proveedor": rng.choices(PROVEEDORES, cum_weights=pesos)[0]
+        }
+        if tipo < 0.40:
+            vencimiento = fecha_base + timedelta(days=rng.randint(1, 730))
+            producto['fecha_vencimiento'] = vencimiento.strftime('%d/%m/%Y')
+        elif tipo < 0.75:
+            producto['garantia'] = rng.choice([0, 1, 1, 2, 3, 5])
+        yield producto
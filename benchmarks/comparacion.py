@@ -0,0 +1,43 @@
+'''
+Comparación de resultados contra una corrida base.
+
+Un benchmark es una regresión si su throughput cae o su p99 sube más que la
+tolerancia relativa respecto de la base. Los resultados ya son medianas de
+varias corridas (ver benchmarks/__main__.py), así que una sola corrida lenta
+no alcanza para marcar una regresión. El p99 solo se compara cuando hay al
+menos MUESTRAS_P99 llamadas: con menos, lo definen unas pocas llamadas lentas
+y varía de una corrida a otra más que la tolerancia.
+'''
+
+MUESTRAS_P99 = 1000
+
+
+def clave(resultado):
+    return resultado['backend'], resultado['escala'], resultado['benchmark']
+
+
+def comparar(resultados, base, tolerancia=0.25):
+    '''Devuelve la lista de regresiones encontradas en `resultados` respecto de `base`'''
+    anteriores = {clave(resultado): resultado for resultado in base}
+    regresiones = []
+    for resultado in resultados:
+        anterior = anteriores.get(clave(resultado))
+        if anterior is None:
+            continue
+        empeoro = {
+            'ops_s': resultado['ops_s'] < anterior['ops_s'] * (1 - tolerancia),
+            'p99_ms': resultado['operaciones'] >= MUESTRAS_P99 and
+            resultado['p99_ms'] > anterior['p99_ms'] * (1 + tolerancia),
+        }
+        for metrica, regresion in empeoro.items():
+            if regresion and anterior[metrica]:
+                backend, escala, benchmark = clave(resultado)
+                regresiones.append({
+                    'backend': backend,
+                    'escala': escala,
+                    'benchmark': benchmark,
+                    'metrica': metrica,
+                    'base': anterior[metrica],
+                    'actual': resultado[metrica]
+                })
+    return regresiones
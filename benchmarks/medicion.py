@@ -0,0 +1,114 @@
+'''
+Medición de tiempos, memoria y entrada/salida de un benchmark.
+
+El RSS máximo es el pico del proceso hasta el momento (getrusage no permite
+reiniciarlo): rss_max_kb es ese pico al terminar el benchmark y
+rss_incremento_kb cuánto creció durante el benchmark. Los bytes
+leídos/escritos salen de /proc/self/io, por lo que solo están disponibles en
+Linux.
+'''
+import contextlib
+import io
+import statistics
+import sys
+import time
+
+# Métricas de tiempo y throughput: varían entre corridas y se combinan con la mediana
+METRICAS_TIEMPO = ('segundos', 'ops_s', 'filas_s', 'p50_ms', 'p99_ms')
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def rss_maximo_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def contadores_io():
+    '''Bytes leídos y escritos por el proceso (rchar/wchar), o None si no hay datos'''
+    try:
+        with open('/proc/self/io', 'r') as archivo:
+            valores = dict(linea.split(':') for linea in archivo)
+        return int(valores['rchar']), int(valores['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def percentil(ordenados, porcentaje):
+    if not ordenados:
+        return 0.0
+    posicion = min(len(ordenados) - 1, int(len(ordenados) * porcentaje / 100))
+    return ordenados[posicion]
+
+
+def medir(nombre, funcion, argumentos, filas=None):
+    '''
+    Ejecuta funcion(*args) para cada elemento de `argumentos` y devuelve las
+    métricas del benchmark. `operaciones` y `ops_s` cuentan llamadas; cuando
+    cada llamada procesa varios productos (una carga por lotes, un recorrido)
+    `filas` indica el total y se informa aparte como `filas_s`.
+    `argumentos` puede ser un generador: solo se mide el tiempo dentro de
+    las llamadas, no el de generar los argumentos.
+    La salida por pantalla de los métodos CRUD se descarta durante la medición.
+    '''
+    latencias = []
+    rss_inicial = rss_maximo_kb()
+    io_inicial = contadores_io()
+    with contextlib.redirect_stdout(io.StringIO()) as descartada:
+        for args in argumentos:
+            comienzo = time.perf_counter_ns()
+            funcion(*args)
+            latencias.append(time.perf_counter_ns() - comienzo)
+            descartada.seek(0)
+            descartada.truncate()
+    duracion = sum(latencias) / 1e9
+    io_final = contadores_io()
+    rss_final = rss_maximo_kb()
+
+    latencias.sort()
+    operaciones = len(latencias)
+    resultado = {
+        'benchmark': nombre,
+        'operaciones': operaciones,
+        'segundos': round(duracion, 6),
+        'ops_s': round(operaciones / duracion, 2) if duracion > 0 else 0.0,
+        'p50_ms': round(percentil(latencias, 50) / 1e6, 4),
+        'p99_ms': round(percentil(latencias, 99) / 1e6, 4),
+        'rss_max_kb': rss_final,
+        'rss_incremento_kb': rss_final - rss_inicial if rss_final is not None else None,
+        'bytes_leidos': None,
+        'bytes_escritos': None,
+    }
+    if filas is not None:
+        resultado['filas'] = filas
+        resultado['filas_s'] = round(filas / duracion, 2) if duracion > 0 else 0.0
+    if io_inicial and io_final:
+        resultado['bytes_leidos'] = io_final[0] - io_inicial[0]
+        resultado['bytes_escritos'] = io_final[1] - io_inicial[1]
+    return resultado
+
+
+def medianas(corridas):
+    '''
+    Combina varias corridas de los mismos benchmarks (listas de resultados en
+    el mismo orden) tomando la mediana de cada métrica de METRICAS_TIEMPO.
+    Las cuentas (memoria, bytes) toman el valor de la corrida del medio
+    (median_low), así siguen siendo enteros.
+    '''
+    combinados = []
+    for resultados in zip(*corridas):
+        combinado = dict(resultados[0])
+        for clave, valor in combinado.items():
+            valores = [resultado[clave] for resultado in resultados]
+            if clave in METRICAS_TIEMPO:
+                combinado[clave] = round(statistics.median(valores), 6)
+            elif isinstance(valor, int) and not isinstance(valor, bool) and None not in valores:
+                combinado[clave] = statistics.median_low(valores)
+        combinado['repeticiones'] = len(resultados)
+        combinados.append(combinado)
+    return combinados
@@ -147,10 +147,17 @@ class GestionProductos:
     def __init__(self, archivo):
         self.archivo = archivo
 
+    def _registrar_error(self, error):
+        '''
+        Se llama con cada error que un método atrapa y solo informa por
+        pantalla. No hace nada: instrumentacion.instrumentar() la reemplaza
+        para contar esos errores.
+        '''
+
     def leer_datos(self):
         try:
-            with open(self.archivo, 'r', encoding='utf-8') as file:
-                datos = json.load(file)
+            with open(self.archivo, 'rb') as file:
+                datos = self._deserializar(file.read())
         except FileNotFoundError:
             return {}
         except json.JSONDecodeError as error:
@@ -165,13 +172,25 @@ class GestionProductos:
 
     def guardar_datos(self, datos):
         try:
-            with open(self.archivo, 'w', encoding='utf-8') as file:
-                json.dump(datos, file, indent=4)
+            self._escribir_datos(datos)
         except IOError as error:
             print(
                 f'Error al intentar guardar los datos en {self.archivo}: {error}')
+            self._registrar_error(error)
         except Exception as error:
             print(f'Error inesperado: {error}')
+            self._registrar_error(error)
+
+    def _escribir_datos(self, datos):
+        contenido = self._serializar(datos)
+        with open(self.archivo, 'wb') as file:
+            file.write(contenido)
+
+    def _deserializar(self, contenido):
+        return json.loads(contenido)
+
+    def _serializar(self, datos):
+        return json.dumps(datos, indent=4).encode('utf-8')
 
     def crear_producto(self, producto):
         try:
@@ -185,6 +204,7 @@ class GestionProductos:
                 print(f'Producto de código {codigo_producto} ya existe')
         except Exception as error:
             print(f'Error inseperado al crear producto: {error}')
+            self._registrar_error(error)
 
     def leer_producto(self, codigo_producto):
         try:
@@ -224,6 +244,7 @@ class GestionProductos:
         except Exception as e:
             print(
                 f'Error al leer el producto con código {codigo_producto}: {e}')
+            self._registrar_error(e)
             return None
 
     def actualizar_producto(self, codigo_producto, nuevo_precio):
@@ -239,6 +260,7 @@ class GestionProductos:
                 print(f'No se encotró el producto de código {codigo_producto}')
         except Exception as e:
             print(f"Error al actualizar el producto: {e}")
+            self._registrar_error(e)
 
     def eliminar_producto(self, codigo_producto):
         try:
@@ -253,3 +275,138 @@ class GestionProductos:
                 print(f'Producto de código {codigo_producto} no encontrado')
         except Exception as e:
             print(f'Error al eliminar el producto: {e}')
+            self._registrar_error(e)
+
+    def ajustar_stock(self, codigo_producto, diferencia):
+        try:
+            datos = self.leer_datos()
+            codigo_producto = str(codigo_producto)
+            if codigo_producto in datos.keys():
+                cantidad = int(datos[codigo_producto]['cantidad']) + int(diferencia)
+                if cantidad < 0:
+                    print(
+                        f'Stock insuficiente para el producto código {codigo_producto}')
+                    return
+                datos[codigo_producto]['cantidad'] = cantidad
+                self.guardar_datos(datos)
+                print(
+                    f'Stock actualizado para el producto código {codigo_producto}')
+            else:
+                print(f'No se encontró el producto de código {codigo_producto}')
+        except Exception as e:
+            print(f'Error al ajustar el stock del producto: {e}')
+            self._registrar_error(e)
+
+    def leer_productos(self, codigos):
+        '''Devuelve {codigo: datos} de los códigos existentes con una sola lectura del archivo'''
+        datos = self.leer_datos()
+        return {str(codigo): dict(datos[str(codigo)])
+                for codigo in codigos if str(codigo) in datos}
+
+    def buscar_productos(self, texto, limite=100):
+        '''Devuelve los productos cuyo nombre o proveedor contienen el texto (limite=None: todos)'''
+        texto = texto.lower()
+        encontrados = []
+        for producto_data in self.leer_datos().values():
+            if texto in str(producto_data.get('nombre', '')).lower() or \
+                    texto in str(producto_data.get('proveedor', '')).lower():
+                encontrados.append(producto_data)
+                if limite is not None and len(encontrados) >= limite:
+                    break
+        return encontrados
+
+    def procesar_lote(self, operaciones):
+        '''
+        Aplica una lista de operaciones leyendo el archivo una sola vez y
+        guardándolo una sola vez al final. Cada operación es un diccionario
+        con la clave "op" (crear, leer, actualizar, eliminar, ajustar_stock).
+        Devuelve un resultado por operación, en el mismo orden. Si el archivo
+        no se puede guardar, todas las modificaciones se informan como fallidas.
+        '''
+        datos = self.leer_datos()
+        resultados = []
+        modificado = False
+        for operacion in operaciones:
+            try:
+                resultado = self._aplicar_operacion(datos, operacion)
+                modificado = modificado or operacion['op'] != 'leer'
+            except Exception as e:
+                resultado = {'op': operacion.get('op'),
+                             'codigo': _codigo_de(operacion),
+                             'ok': False, 'error': str(e)}
+            resultados.append(resultado)
+        if modificado:
+            try:
+                self._escribir_datos(datos)
+            except Exception as e:
+                error = f'No se pudieron guardar los datos en {self.archivo}: {e}'
+                for resultado in resultados:
+                    if resultado['ok'] and resultado['op'] != 'leer':
+                        resultado.update(ok=False, error=error)
+                        resultado.pop('cantidad', None)
+        return resultados
+
+    def _aplicar_operacion(self, datos, operacion):
+        tipo = operacion['op']
+        if tipo == 'crear':
+            producto = producto_desde_dict(operacion['producto'])
+            codigo_producto = str(producto.codigo_producto)
+        else:
+            codigo_producto = str(operacion['codigo'])
+        resultado = {'op': tipo, 'codigo': codigo_producto, 'ok': True}
+
+        if tipo == 'crear':
+            if codigo_producto in datos:
+                raise ValueError(
+                    f'Producto de código {codigo_producto} ya existe')
+            datos[codigo_producto] = producto.to_dict()
+            return resultado
+
+        if codigo_producto not in datos:
+            raise ValueError(
+                f'No se encontró el producto con código: {codigo_producto}')
+
+        if tipo == 'leer':
+            resultado['producto'] = dict(datos[codigo_producto])
+        elif tipo == 'actualizar':
+            precio = float(operacion['precio'])
+            if precio < 0:
+                raise ValueError("El precio debe ser un número positivo")
+            datos[codigo_producto]['precio'] = precio
+        elif tipo == 'eliminar':
+            del datos[codigo_producto]
+        elif tipo == 'ajustar_stock':
+            cantidad = int(datos[codigo_producto]['cantidad']) + \
+                int(operacion['diferencia'])
+            if cantidad < 0:
+                raise ValueError(
+                    f'Stock insuficiente para el producto código {codigo_producto}')
+            datos[codigo_producto]['cantidad'] = cantidad
+            resultado['cantidad'] = cantidad
+        else:
+            raise ValueError(f'Operación desconocida: {tipo}')
+        return resultado
+
+
+def _codigo_de(operacion):
+    '''Código de la operación como texto, igual que en los resultados exitosos'''
+    codigo = operacion.get('codigo')
+    if codigo is None and isinstance(operacion.get('producto'), dict):
+        codigo = operacion['producto'].get('codigo')
+    return None if codigo is None else str(codigo)
+
+
+def producto_desde_dict(producto_data):
+    '''Construye el producto de la clase que corresponde a los datos recibidos'''
+    base = dict(
+        codigo_producto=producto_data.get("codigo", None),
+        nombre=producto_data.get("nombre", ""),
+        precio=producto_data.get("precio", 0.0),
+        cantidad=producto_data.get("cantidad", "0"),
+        proveedor=producto_data.get("proveedor", ""))
+    if 'fecha_vencimiento' in producto_data:
+        return ProductoAlimenticio(
+            fecha_vencimiento=producto_data["fecha_vencimiento"], **base)
+    if 'garantia' in producto_data:
+        return ProductoElectronico(garantia=producto_data["garantia"], **base)
+    return Producto(**base)
@@ -10,9 +10,11 @@ Desafío 1: Sistema de Gestión de Productos
 '''
 from datetime import datetime, date
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, errorcode
+from mysql.connector.constants import ClientFlag
 from decouple import config
 import json
+from itertools import groupby
 # Clase Producto
 
 
@@ -141,6 +143,13 @@ class GestionProductos:
         self.password = config('DB_PASSWORD')
         self.port = config('DB_PORT')
 
+    def _registrar_error(self, error):
+        '''
+        Se llama con cada error que un método atrapa y solo informa por
+        pantalla. No hace nada: instrumentacion.instrumentar() la reemplaza
+        para contar esos errores.
+        '''
+
     def connect(self):
         try:
             connection = mysql.connector.connect(
@@ -148,13 +157,16 @@ class GestionProductos:
                 database=self.database,
                 user=self.user,
                 password=self.password,
-                port=self.port
+                port=self.port,
+                # rowcount cuenta las filas encontradas y no solo las modificadas
+                client_flags=[ClientFlag.FOUND_ROWS]
             )
             if connection.is_connected():
                 return connection
 
         except Error as e:
             print(f'Error al conectar a la Base de Datos: {e}')
+            self._registrar_error(e)
             return None
 
     def leer_datos(self):
@@ -175,44 +187,24 @@ class GestionProductos:
         except IOError as error:
             print(
                 f'Error al intentar guardar los datos en {self.archivo}: {error}')
+            self._registrar_error(error)
         except Exception as error:
             print(f'Error inesperado: {error}')
+            self._registrar_error(error)
 
     def crear_producto(self, producto):
         try:
             connection = self.connect()
             if connection:
                 with connection.cursor() as cursor:
-                    query = '''
-                    INSERT INTO productos (nombre, precio, cantidad, proveedor)
-                    VALUES (%s, %s, %s, %s)
-                    '''
-                    cursor.execute(
-                        query, (producto.nombre, producto.precio, producto.cantidad, producto.proveedor))
-
-                    codigo_producto = cursor.lastrowid
-
-                    if isinstance(producto, ProductoAlimenticio):
-                        query = '''
-                        INSERT INTO productoAlimenticio (codigo_producto, fecha_vencimiento)
-                        VALUES (%s, %s)
-                        '''
-                        cursor.execute(
-                            query, (codigo_producto, producto.fecha_vencimiento))
-
-                    elif isinstance(producto, ProductoElectronico):
-                        query = '''
-                        INSERT INTO productoElectronico (codigo_producto, garantia)
-                        VALUES (%s, %s)
-                        '''
-                        cursor.execute(
-                            query, (codigo_producto, producto.garantia))
+                    self._insertar_producto(cursor, producto)
 
                 connection.commit()
                 print(f'Producto {producto.nombre} creado correctamente')
 
         except Exception as error:
             print(f'Error inesperado al crear producto: {error}')
+            self._registrar_error(error)
 
     def leer_producto(self, codigo_producto):
         try:
@@ -252,6 +244,7 @@ class GestionProductos:
         except Exception as e:
             print(
                 f'Error al leer el producto con código {codigo_producto}: {e}')
+            self._registrar_error(e)
         finally:
             if connection.is_connected():
                 connection.close()
@@ -262,7 +255,7 @@ class GestionProductos:
             if connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
-                        'SELECT * FROM productos WHERE codigo_producto: %s', (codigo_producto))
+                        'SELECT * FROM productos WHERE codigo_producto = %s', (codigo_producto,))
                     if not cursor.fetchone():
                         print(
                             f'No se encontró el producto con código: {codigo_producto}')
@@ -280,6 +273,7 @@ class GestionProductos:
 
         except Exception as e:
             print(f"Error al actualizar el producto: {e}")
+            self._registrar_error(e)
         finally:
             if connection.is_connected():
                 connection.close()
@@ -311,6 +305,283 @@ class GestionProductos:
                             f'Producto con código {codigo_producto} no encontrado')
         except Exception as e:
             print(f'Error al eliminar el producto: {e}')
+            self._registrar_error(e)
+        finally:
+            if connection.is_connected():
+                connection.close()
+
+    def ajustar_stock(self, codigo_producto, diferencia):
+        try:
+            connection = self.connect()
+            if connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'UPDATE productos SET cantidad = cantidad + %s WHERE codigo_producto = %s AND cantidad + %s >= 0',
+                        (diferencia, codigo_producto, diferencia))
+                    if cursor.rowcount > 0:
+                        connection.commit()
+                        print(
+                            f'Stock actualizado para el producto de código: {codigo_producto}')
+                    else:
+                        print(
+                            f'No se encontró el producto de código {codigo_producto} o el stock es insuficiente')
+        except Exception as e:
+            print(f'Error al ajustar el stock del producto: {e}')
+            self._registrar_error(e)
+        finally:
+            if connection and connection.is_connected():
+                connection.close()
+
+    def leer_productos(self, codigos):
+        '''Devuelve {codigo: datos} de los códigos existentes con una sola consulta IN (...)'''
+        codigos = list(codigos)
+        if not codigos:
+            return {}
+        connection = self.connect()
+        if not connection:
+            raise ConnectionError('Sin conexión a la Base de Datos')
+        try:
+            with connection.cursor(dictionary=True) as cursor:
+                marcadores = ', '.join(['%s'] * len(codigos))
+                cursor.execute(
+                    SELECT_PRODUCTO + f' WHERE p.codigo_producto IN ({marcadores})', codigos)
+                return {str(fila['codigo_producto']): fila_a_dict(fila)
+                        for fila in cursor.fetchall()}
         finally:
             if connection.is_connected():
                 connection.close()
+
+    def buscar_productos(self, texto, limite=100):
+        '''Devuelve los productos cuyo nombre o proveedor contienen el texto (limite=None: todos)'''
+        connection = self.connect()
+        if not connection:
+            raise ConnectionError('Sin conexión a la Base de Datos')
+        try:
+            with connection.cursor(dictionary=True) as cursor:
+                patron = f'%{texto}%'
+                query = SELECT_PRODUCTO + ' WHERE p.nombre LIKE %s OR p.proveedor LIKE %s'
+                parametros = (patron, patron)
+                if limite is not None:
+                    query += ' LIMIT %s'
+                    parametros += (int(limite),)
+                cursor.execute(query, parametros)
+                return [fila_a_dict(fila) for fila in cursor.fetchall()]
+        finally:
+            if connection.is_connected():
+                connection.close()
+
+    def procesar_lote(self, operaciones):
+        '''
+        Aplica una lista de operaciones usando una única conexión y una única
+        transacción. Cada operación es un diccionario con la clave "op"
+        (crear, leer, actualizar, eliminar, ajustar_stock). Las altas
+        consecutivas se insertan juntas con un INSERT de varias filas.
+        Un error solo descarta la operación que falló: las de una sola
+        sentencia ya se deshacen solas en InnoDB, y eliminar y las altas
+        reintentadas de a una se aíslan con un SAVEPOINT.
+        Devuelve un resultado por operación, en el mismo orden.
+        '''
+        operaciones = list(operaciones)
+        connection = self.connect()
+        if not connection:
+            return [{'op': operacion.get('op'), 'codigo': _codigo_de(operacion),
+                     'ok': False, 'error': 'Sin conexión a la Base de Datos'}
+                    for operacion in operaciones]
+        resultados = []
+        try:
+            with connection.cursor(dictionary=True) as cursor:
+                for es_alta, grupo in groupby(
+                        operaciones, lambda operacion: operacion.get('op') == 'crear'):
+                    grupo = list(grupo)
+                    if es_alta and len(grupo) > 1:
+                        resultados += self._crear_grupo(cursor, grupo)
+                    else:
+                        resultados += [self._aplicar_aislada(cursor, operacion)
+                                       for operacion in grupo]
+            connection.commit()
+        except Exception as e:
+            connection.rollback()
+            resultados = [{'op': operacion.get('op'), 'codigo': _codigo_de(operacion),
+                           'ok': False, 'error': f'Lote descartado: {e}'}
+                          for operacion in operaciones]
+        finally:
+            if connection.is_connected():
+                connection.close()
+        return resultados
+
+    def _aplicar_aislada(self, cursor, operacion):
+        '''Aplica una operación del lote; si falla, solo se descarta esa operación'''
+        savepoint = operacion.get('op') in ('crear', 'eliminar')
+        if savepoint:
+            cursor.execute('SAVEPOINT operacion')
+        try:
+            return self._aplicar_operacion(cursor, operacion)
+        except Exception as e:
+            if isinstance(e, Error) and e.errno == errorcode.ER_LOCK_DEADLOCK:
+                # InnoDB ya deshizo toda la transacción: se descarta el lote
+                raise
+            if savepoint:
+                cursor.execute('ROLLBACK TO SAVEPOINT operacion')
+            return {'op': operacion.get('op'), 'codigo': _codigo_de(operacion),
+                    'ok': False, 'error': str(e)}
+
+    def _crear_grupo(self, cursor, operaciones):
+        '''
+        Inserta varias altas con un INSERT de varias filas por tabla. Si el
+        grupo falla, se deshace y las altas se aplican una por una.
+        '''
+        resultados, productos = [], []
+        for operacion in operaciones:
+            try:
+                productos.append((len(resultados), producto_desde_dict(operacion['producto'])))
+                resultados.append(None)
+            except Exception as e:
+                resultados.append({'op': 'crear', 'codigo': _codigo_de(operacion),
+                                   'ok': False, 'error': str(e)})
+        if not productos:
+            return resultados
+
+        cursor.execute('SAVEPOINT grupo')
+        try:
+            valores = [valor for _, producto in productos for valor in
+                       (producto.nombre, producto.precio, producto.cantidad, producto.proveedor)]
+            cursor.execute(
+                'INSERT INTO productos (nombre, precio, cantidad, proveedor) VALUES ' +
+                ', '.join(['(%s, %s, %s, %s)'] * len(productos)), valores)
+            # Un INSERT de varias filas recibe códigos consecutivos a partir de lastrowid
+            primero = cursor.lastrowid
+            cursor.execute('SELECT @@auto_increment_increment AS incremento')
+            incremento = cursor.fetchone()['incremento']
+            codigos = [primero + indice * incremento for indice in range(len(productos))]
+            alimenticios = [(codigo, producto.fecha_vencimiento)
+                            for codigo, (_, producto) in zip(codigos, productos)
+                            if isinstance(producto, ProductoAlimenticio)]
+            electronicos = [(codigo, producto.garantia)
+                            for codigo, (_, producto) in zip(codigos, productos)
+                            if isinstance(producto, ProductoElectronico)]
+            if alimenticios:
+                cursor.executemany(
+                    'INSERT INTO productoAlimenticio (codigo_producto, fecha_vencimiento) VALUES (%s, %s)',
+                    alimenticios)
+            if electronicos:
+                cursor.executemany(
+                    'INSERT INTO productoElectronico (codigo_producto, garantia) VALUES (%s, %s)',
+                    electronicos)
+        except Exception as e:
+            if isinstance(e, Error) and e.errno == errorcode.ER_LOCK_DEADLOCK:
+                raise
+            cursor.execute('ROLLBACK TO SAVEPOINT grupo')
+            for posicion, _ in productos:
+                resultados[posicion] = self._aplicar_aislada(cursor, operaciones[posicion])
+            return resultados
+
+        for codigo, (posicion, _) in zip(codigos, productos):
+            resultados[posicion] = {'op': 'crear', 'codigo': str(codigo), 'ok': True}
+        return resultados
+
+    def _insertar_producto(self, cursor, producto):
+        cursor.execute(
+            'INSERT INTO productos (nombre, precio, cantidad, proveedor) VALUES (%s, %s, %s, %s)',
+            (producto.nombre, producto.precio, producto.cantidad, producto.proveedor))
+        codigo_producto = cursor.lastrowid
+        if isinstance(producto, ProductoAlimenticio):
+            cursor.execute(
+                'INSERT INTO productoAlimenticio (codigo_producto, fecha_vencimiento) VALUES (%s, %s)',
+                (codigo_producto, producto.fecha_vencimiento))
+        elif isinstance(producto, ProductoElectronico):
+            cursor.execute(
+                'INSERT INTO productoElectronico (codigo_producto, garantia) VALUES (%s, %s)',
+                (codigo_producto, producto.garantia))
+        return codigo_producto
+
+    def _aplicar_operacion(self, cursor, operacion):
+        tipo = operacion['op']
+        if tipo == 'crear':
+            producto = producto_desde_dict(operacion['producto'])
+            codigo_producto = self._insertar_producto(cursor, producto)
+            return {'op': tipo, 'codigo': str(codigo_producto), 'ok': True}
+
+        codigo_producto = operacion['codigo']
+        resultado = {'op': tipo, 'codigo': str(codigo_producto), 'ok': True}
+        if tipo == 'leer':
+            cursor.execute(
+                SELECT_PRODUCTO + ' WHERE p.codigo_producto = %s', (codigo_producto,))
+            fila = cursor.fetchone()
+            if not fila:
+                raise ValueError(
+                    f'No se encontró el producto con código: {codigo_producto}')
+            resultado['producto'] = fila_a_dict(fila)
+        elif tipo == 'actualizar':
+            precio = float(operacion['precio'])
+            if precio < 0:
+                raise ValueError("El precio debe ser un número positivo")
+            cursor.execute(
+                'UPDATE productos SET precio = %s WHERE codigo_producto = %s', (precio, codigo_producto))
+        elif tipo == 'eliminar':
+            cursor.execute(
+                'DELETE FROM productoAlimenticio WHERE codigo_producto = %s', (codigo_producto,))
+            cursor.execute(
+                'DELETE FROM productoElectronico WHERE codigo_producto = %s', (codigo_producto,))
+            cursor.execute(
+                'DELETE FROM productos WHERE codigo_producto = %s', (codigo_producto,))
+        elif tipo == 'ajustar_stock':
+            diferencia = int(operacion['diferencia'])
+            cursor.execute(
+                'UPDATE productos SET cantidad = cantidad + %s WHERE codigo_producto = %s AND cantidad + %s >= 0',
+                (diferencia, codigo_producto, diferencia))
+        else:
+            raise ValueError(f'Operación desconocida: {tipo}')
+
+        if tipo != 'leer' and cursor.rowcount == 0:
+            raise ValueError(
+                f'No se encontró el producto con código {codigo_producto} o la operación no es válida')
+        return resultado
+
+
+SELECT_PRODUCTO = '''
+    SELECT p.codigo_producto, p.nombre, p.precio, p.cantidad, p.proveedor,
+           a.fecha_vencimiento, e.garantia
+    FROM productos p
+    LEFT JOIN productoAlimenticio a ON a.codigo_producto = p.codigo_producto
+    LEFT JOIN productoElectronico e ON e.codigo_producto = p.codigo_producto
+'''
+
+
+def fila_a_dict(fila):
+    '''Convierte una fila de SELECT_PRODUCTO al formato de to_dict()'''
+    datos = {
+        "codigo": fila['codigo_producto'],
+        "nombre": fila['nombre'],
+        "precio": float(fila['precio']),
+        "cantidad": fila['cantidad'],
+        "proveedor": fila['proveedor']
+    }
+    if fila.get('fecha_vencimiento') is not None:
+        datos['fecha_vencimiento'] = fila['fecha_vencimiento'].strftime(
+            '%Y-%m-%d')
+    elif fila.get('garantia') is not None:
+        datos['garantia'] = fila['garantia']
+    return datos
+
+
+def _codigo_de(operacion):
+    '''Código de la operación como texto, igual que en los resultados exitosos'''
+    codigo = operacion.get('codigo')
+    if codigo is None and isinstance(operacion.get('producto'), dict):
+        codigo = operacion['producto'].get('codigo')
+    return None if codigo is None else str(codigo)
+
+
+def producto_desde_dict(producto_data):
+    '''Construye el producto de la clase que corresponde a los datos recibidos'''
+    base = dict(
+        nombre=producto_data.get("nombre", ""),
+        precio=producto_data.get("precio", 0.0),
+        cantidad=producto_data.get("cantidad", "0"),
+        proveedor=producto_data.get("proveedor", ""))
+    if 'fecha_vencimiento' in producto_data:
+        return ProductoAlimenticio(
+            fecha_vencimiento=producto_data["fecha_vencimiento"], **base)
+    if 'garantia' in producto_data:
+        return ProductoElectronico(garantia=producto_data["garantia"], **base)
+    return Producto(**base)
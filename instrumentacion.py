@@ -0,0 +1,293 @@
+'''
+Instrumentación de GestionProductos.
+
+instrumentar(gestion) envuelve los métodos de una instancia de cualquiera de
+los backends y registra, por operación (leer_producto, crear_producto, ...):
+    - histogramas de tiempo total y de cada etapa: conexión, sql, leer_datos,
+      guardar_datos, escribir_datos, parse y serializar
+    - consultas SQL, idas y vueltas al servidor y conexiones abiertas
+    - bytes leídos y escritos del archivo JSON
+Los errores que los métodos CRUD atrapan y solo imprimen se informan al
+backend con _registrar_error(), y se cuentan como "errores" de la operación.
+Además se pueden registrar aciertos y fallos de cachés con registrar_cache().
+
+Los datos se exportan con registro.instantanea() (JSON) o
+registro.exportar_prometheus() (formato de texto de Prometheus).
+Una instancia sin instrumentar no tiene ningún costo adicional, y con
+registro.activo = False cada llamada solo agrega una comprobación.
+
+Para seguir cada medición en el momento se pueden agregar ganchos:
+
+    def mostrar(evento):
+        print(evento['operacion'], evento['etapa'], evento['segundos'])
+
+    agregar_gancho(mostrar)
+
+La operación en curso está en la variable de contexto operacion_actual.
+'''
+import contextvars
+import functools
+import threading
+import time
+
+LIMITES = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+           0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float('inf'))
+
+# Método del backend -> etapa que representa cuando se llama dentro de otra operación
+ETAPAS = {
+    'crear_producto': 'crear_producto',
+    'leer_producto': 'leer_producto',
+    'actualizar_producto': 'actualizar_producto',
+    'eliminar_producto': 'eliminar_producto',
+    'ajustar_stock': 'ajustar_stock',
+    'procesar_lote': 'procesar_lote',
+    'leer_productos': 'leer_productos',
+    'buscar_productos': 'buscar_productos',
+    'leer_datos': 'leer_datos',
+    'guardar_datos': 'guardar_datos',
+    '_escribir_datos': 'escribir_datos',
+    'connect': 'conexion',
+    '_deserializar': 'parse',
+    '_serializar': 'serializar',
+}
+
+operacion_actual = contextvars.ContextVar('operacion_actual', default=None)
+# [bool]: si la operación en curso atrapó algún error sin propagarlo
+error_actual = contextvars.ContextVar('error_actual', default=None)
+
+
+class Histograma:
+    def __init__(self):
+        self.cuentas = [0] * len(LIMITES)
+        self.suma = 0.0
+        self.total = 0
+        self.maximo = 0.0
+
+    def observar(self, segundos):
+        self.suma += segundos
+        self.total += 1
+        self.maximo = max(self.maximo, segundos)
+        for posicion, limite in enumerate(LIMITES):
+            if segundos <= limite:
+                self.cuentas[posicion] += 1
+                break
+
+    def acumuladas(self):
+        acumulado, resultado = 0, []
+        for cuenta in self.cuentas:
+            acumulado += cuenta
+            resultado.append(acumulado)
+        return resultado
+
+    def percentil(self, porcentaje):
+        '''
+        Límite superior del bucket que contiene el percentil pedido, sin pasar
+        del máximo observado. Así el valor nunca supera a max_ms y sigue siendo
+        finito (serializable a JSON) aunque caiga en el último bucket.
+        '''
+        objetivo = self.total * porcentaje / 100
+        for limite, acumulado in zip(LIMITES, self.acumuladas()):
+            if acumulado >= objetivo:
+                return min(limite, self.maximo)
+        return self.maximo
+
+
+class Registro:
+    def __init__(self):
+        self.activo = True
+        self.ganchos = []
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.histogramas = {}
+            self.contadores = {}
+            self.caches = {}
+
+    def observar(self, operacion, etapa, segundos):
+        with self._lock:
+            histograma = self.histogramas.get((operacion, etapa))
+            if histograma is None:
+                histograma = self.histogramas[(operacion, etapa)] = Histograma()
+            histograma.observar(segundos)
+        for gancho in self.ganchos:
+            gancho({'operacion': operacion, 'etapa': etapa, 'segundos': segundos})
+
+    def sumar(self, evento, valor=1):
+        clave = (operacion_actual.get() or 'sin_operacion', evento)
+        with self._lock:
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+
+    def registrar_cache(self, nombre, acierto):
+        with self._lock:
+            aciertos, fallos = self.caches.get(nombre, (0, 0))
+            self.caches[nombre] = (aciertos + 1, fallos) if acierto else (aciertos, fallos + 1)
+
+    def instantanea(self):
+        with self._lock:
+            operaciones = {}
+            for (operacion, etapa), histograma in sorted(self.histogramas.items()):
+                operaciones.setdefault(operacion, {'etapas': {}})['etapas'][etapa] = {
+                    'llamadas': histograma.total,
+                    'segundos': round(histograma.suma, 6),
+                    'promedio_ms': round(histograma.suma / histograma.total * 1000, 4),
+                    'p50_ms': histograma.percentil(50) * 1000,
+                    'p99_ms': histograma.percentil(99) * 1000,
+                    'max_ms': round(histograma.maximo * 1000, 4),
+                }
+            for (operacion, evento), valor in sorted(self.contadores.items()):
+                datos = operaciones.setdefault(operacion, {'etapas': {}})
+                datos[evento] = valor
+                llamadas = datos['etapas'].get('total', {}).get('llamadas')
+                if llamadas:
+                    datos[f'{evento}_por_llamada'] = round(valor / llamadas, 3)
+            caches = {}
+            for nombre, (aciertos, fallos) in sorted(self.caches.items()):
+                total = aciertos + fallos
+                caches[nombre] = {'aciertos': aciertos, 'fallos': fallos,
+                                  'tasa_aciertos': round(aciertos / total, 4) if total else 0.0}
+        return {'operaciones': operaciones, 'caches': caches}
+
+    def exportar_prometheus(self, prefijo='gestion_productos'):
+        lineas = [f'# TYPE {prefijo}_segundos histogram']
+        with self._lock:
+            for (operacion, etapa), histograma in sorted(self.histogramas.items()):
+                etiquetas = f'operacion="{operacion}",etapa="{etapa}"'
+                for limite, acumulado in zip(LIMITES, histograma.acumuladas()):
+                    le = '+Inf' if limite == float('inf') else repr(limite)
+                    lineas.append(
+                        f'{prefijo}_segundos_bucket{{{etiquetas},le="{le}"}} {acumulado}')
+                lineas.append(f'{prefijo}_segundos_sum{{{etiquetas}}} {histograma.suma}')
+                lineas.append(f'{prefijo}_segundos_count{{{etiquetas}}} {histograma.total}')
+            lineas.append(f'# TYPE {prefijo}_eventos_total counter')
+            for (operacion, evento), valor in sorted(self.contadores.items()):
+                lineas.append(
+                    f'{prefijo}_eventos_total{{operacion="{operacion}",evento="{evento}"}} {valor}')
+            lineas.append(f'# TYPE {prefijo}_cache_total counter')
+            for nombre, (aciertos, fallos) in sorted(self.caches.items()):
+                lineas.append(f'{prefijo}_cache_total{{cache="{nombre}",resultado="acierto"}} {aciertos}')
+                lineas.append(f'{prefijo}_cache_total{{cache="{nombre}",resultado="fallo"}} {fallos}')
+        return '\n'.join(lineas) + '\n'
+
+
+registro = Registro()
+
+
+def agregar_gancho(gancho, registro=registro):
+    registro.ganchos.append(gancho)
+
+
+def quitar_gancho(gancho, registro=registro):
+    registro.ganchos.remove(gancho)
+
+
+def registrar_cache(nombre, acierto, registro=registro):
+    if registro.activo:
+        registro.registrar_cache(nombre, acierto)
+
+
+class CursorMedido:
+    def __init__(self, cursor, registro):
+        self._cursor = cursor
+        self._registro = registro
+
+    def execute(self, *args, **kwargs):
+        if not self._registro.activo:
+            return self._cursor.execute(*args, **kwargs)
+        self._registro.sumar('consultas_sql')
+        self._registro.sumar('idas_y_vueltas')
+        inicio = time.perf_counter()
+        try:
+            return self._cursor.execute(*args, **kwargs)
+        finally:
+            self._registro.observar(operacion_actual.get() or 'sin_operacion', 'sql',
+                                    time.perf_counter() - inicio)
+
+    def __enter__(self):
+        self._cursor.__enter__()
+        return self
+
+    def __exit__(self, *args):
+        return self._cursor.__exit__(*args)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+
+class ConexionMedida:
+    def __init__(self, conexion, registro):
+        self._conexion = conexion
+        self._registro = registro
+
+    def cursor(self, *args, **kwargs):
+        return CursorMedido(self._conexion.cursor(*args, **kwargs), self._registro)
+
+    def commit(self):
+        if self._registro.activo:
+            self._registro.sumar('idas_y_vueltas')
+        return self._conexion.commit()
+
+    def rollback(self):
+        if self._registro.activo:
+            self._registro.sumar('idas_y_vueltas')
+        return self._conexion.rollback()
+
+    def __getattr__(self, nombre):
+        return getattr(self._conexion, nombre)
+
+
+def _envolver(metodo, etapa, registro):
+    @functools.wraps(metodo)
+    def envoltura(*args, **kwargs):
+        if not registro.activo:
+            return metodo(*args, **kwargs)
+        operacion = operacion_actual.get()
+        token = None
+        if operacion is None:
+            operacion = metodo.__name__
+            token = operacion_actual.set(operacion)
+            marca = [False]
+            token_error = error_actual.set(marca)
+        inicio = time.perf_counter()
+        try:
+            resultado = metodo(*args, **kwargs)
+            if etapa == 'conexion' and resultado is not None:
+                registro.sumar('conexiones')
+                resultado = ConexionMedida(resultado, registro)
+            elif etapa == 'parse':
+                registro.sumar('bytes_leidos', len(args[0]))
+            elif etapa == 'serializar':
+                registro.sumar('bytes_escritos', len(resultado))
+            elif etapa == 'procesar_lote':
+                registro.sumar('errores', sum(1 for r in resultado if not r['ok']))
+            return resultado
+        except Exception:
+            registro.sumar('excepciones')
+            raise
+        finally:
+            registro.observar(operacion, 'total' if token else etapa,
+                              time.perf_counter() - inicio)
+            if token:
+                if marca[0]:
+                    registro.sumar('errores')
+                error_actual.reset(token_error)
+                operacion_actual.reset(token)
+    return envoltura
+
+
+def _marcar_error(error):
+    marca = error_actual.get()
+    if marca is not None:
+        marca[0] = True
+
+
+def instrumentar(gestion, registro=registro):
+    '''Envuelve los métodos de `gestion` para que se midan en `registro`. Devuelve la misma instancia.'''
+    for nombre, etapa in ETAPAS.items():
+        metodo = getattr(gestion, nombre, None)
+        if metodo is not None:
+            setattr(gestion, nombre, _envolver(metodo, etapa, registro))
+    if hasattr(gestion, '_registrar_error'):
+        gestion._registrar_error = _marcar_error
+    return gestion
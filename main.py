@@ -1,8 +1,14 @@
+import argparse
+import atexit
+import json
 import os
 import platform
+import sys
+import time
+from itertools import islice
 
-from gestion_productos import (
-    ProductoAlimenticio, ProductoElectronico, GestionProductos)
+from backends import BACKENDS, crear_gestion
+from trazas import grabar
 
 
 def limpiar_pantalla():
@@ -18,6 +24,9 @@ def mostrar_menu():
     print("1. Agregar Producto Alimenticio")
     print("2. Agregar Producto Electrónico")
     print('3. Buscar Producto por código')
+    print('4. Actualizar precio de un Producto')
+    print('5. Eliminar Producto por código')
+    print('6. Mostrar todos los Productos')
 
 
 def agregar_producto(gestion, tipo_producto):
@@ -58,10 +67,15 @@ def buscar_producto_por_codigo(gestion):
 
 
 def actualizar_precio_producto(gestion):
-    codigo_producto = input(
-        'Ingrese el código del producto cuyo precio desea actualizar: ')
-    precio = float(input('Ingrese el precio del preoducto'))
-    gestion.actualizar_producto(codigo_producto, precio)
+    try:
+        codigo_producto = input(
+            'Ingrese el código del producto cuyo precio desea actualizar: ')
+        precio = float(input('Ingrese el precio del preoducto'))
+        gestion.actualizar_producto(codigo_producto, precio)
+    except ValueError as e:
+        print(f"Error: el precio debe ser un número ({e})")
+    except Exception as e:
+        print(f"Error inesperado: {e}")
     input('Presione Enter para continuar')
 
 
@@ -73,17 +87,142 @@ def eliminar_producto_por_codigo(gestion):
 
 
 def mostrar_todos_los_productos(gestion):
-    for producto in gestion.leer_datos().values():
-        if 'fecha_vencimiento' in producto:
-            print(
-                f"{producto['nombre']} - Fecha de vencimiento {producto['fecha_vencimiento']}")
+    try:
+        for producto in gestion.buscar_productos('', limite=None):
+            if 'fecha_vencimiento' in producto:
+                print(
+                    f"{producto['nombre']} - Fecha de vencimiento {producto['fecha_vencimiento']}")
+            elif 'garantia' in producto:
+                print(
+                    f"{producto['nombre']} - Años de Garantía: {producto['garantia']}")
+            else:
+                print(f"{producto['nombre']} - Proveedor: {producto['proveedor']}")
+    except Exception as e:
+        print(f"Error al listar los productos: {e}")
+    input('Presione Enter para continuar')
+
+
+def leer_operaciones(entrada):
+    '''Genera las operaciones de un flujo JSONL, una por línea'''
+    for numero, linea in enumerate(entrada, start=1):
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            operacion = json.loads(linea)
+            if not isinstance(operacion, dict) or 'op' not in operacion:
+                raise ValueError('La operación debe ser un objeto con la clave "op"')
+        except ValueError as e:
+            operacion = {'op': None, 'error': f'Línea {numero} inválida: {e}'}
+        yield operacion
+
+
+def procesar_lotes(gestion, entrada, salida, tamanio_lote=1000):
+    '''
+    Envía las operaciones de `entrada` al backend en lotes de `tamanio_lote`
+    y escribe un resultado JSONL por operación en `salida`.
+    Devuelve la cantidad de operaciones procesadas y de errores.
+    '''
+    operaciones = leer_operaciones(entrada)
+    total = errores = 0
+    while True:
+        lote = list(islice(operaciones, tamanio_lote))
+        if not lote:
+            break
+        validas = [operacion for operacion in lote if 'error' not in operacion]
+        resultados = iter(gestion.procesar_lote(validas)) if validas else iter(())
+        lineas = []
+        for operacion in lote:
+            if 'error' in operacion:
+                resultado = {'op': None, 'ok': False, 'error': operacion['error']}
+            else:
+                resultado = next(resultados)
+            if not resultado['ok']:
+                errores += 1
+            lineas.append(json.dumps(resultado, ensure_ascii=False, default=str))
+        lineas.append('')
+        salida.write('\n'.join(lineas))
+        total += len(lote)
+    return total, errores
+
+
+def guardar_metricas(archivo):
+    from instrumentacion import registro
+    with open(archivo, 'w', encoding='utf-8') as salida:
+        if archivo.endswith('.prom'):
+            salida.write(registro.exportar_prometheus())
         else:
-            print(
-                f"{producto['nombre']} - Años de Garantía: {producto['garantia']}")
+            json.dump(registro.instantanea(), salida, indent=4)
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        description='Gestión de productos. Sin --lote se abre el menú interactivo.')
+    parser.add_argument('--lote', metavar='ARCHIVO',
+                        help='procesa un archivo JSONL de operaciones ("-" para stdin)')
+    parser.add_argument('--salida', default='-', metavar='ARCHIVO',
+                        help='archivo JSONL de resultados ("-" para stdout)')
+    parser.add_argument('--tamanio-lote', type=int, default=1000)
+    parser.add_argument('--backend', choices=BACKENDS,
+                        help='backend del modo lote (por defecto mysql)')
+    parser.add_argument('--archivo',
+                        help='archivo de datos del backend json (por defecto productos_db.json)')
+    parser.add_argument('--metricas', metavar='ARCHIVO',
+                        help='guarda las métricas del backend al terminar (JSON, o Prometheus si termina en .prom)')
+    parser.add_argument('--grabar', metavar='ARCHIVO',
+                        help='graba las llamadas al backend en una traza (ver trazas.py)')
+    return parser
+
+
+def modo_lote(args):
+    if args.tamanio_lote < 1:
+        raise SystemExit('--tamanio-lote debe ser mayor a cero')
+
+    gestion = crear_gestion(args.backend or 'mysql', args.archivo or 'productos_db.json',
+                            bool(args.metricas), args.grabar)
+    entrada = sys.stdin if args.lote == '-' else open(
+        args.lote, 'r', encoding='utf-8')
+    salida = sys.stdout if args.salida == '-' else open(
+        args.salida, 'w', encoding='utf-8')
+    inicio = time.perf_counter()
+    try:
+        total, errores = procesar_lotes(
+            gestion, entrada, salida, args.tamanio_lote)
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if salida is not sys.stdout:
+            salida.close()
+    duracion = time.perf_counter() - inicio
+    ritmo = total / duracion if duracion > 0 else 0.0
+    print(f'Operaciones: {total} - Errores: {errores} - '
+          f'Tiempo: {duracion:.2f} s - {ritmo:.0f} ops/s', file=sys.stderr)
+    if args.metricas:
+        guardar_metricas(args.metricas)
+    return 1 if errores else 0
 
 
 if __name__ == "__main__":
+    parser = crear_parser()
+    args = parser.parse_args()
+    if args.lote:
+        sys.exit(modo_lote(args))
+    if args.backend or args.archivo:
+        # El menú interactivo siempre usa MySQL
+        parser.error('--backend y --archivo solo se pueden usar con --lote')
+
+    # El menú crea productos del backend MySQL; se importa recién acá para que
+    # el modo lote con --backend json no necesite el conector de MySQL.
+    from gestion_productos import (
+        ProductoAlimenticio, ProductoElectronico, GestionProductos)
+
     gestion = GestionProductos()
+    if args.metricas:
+        from instrumentacion import instrumentar
+        gestion = instrumentar(gestion)
+        atexit.register(guardar_metricas, args.metricas)
+    if args.grabar:
+        gestion = grabar(gestion, args.grabar)
     while True:
         mostrar_menu()
         opcion = input('Seleccione una opción: ')
@@ -94,5 +233,14 @@ if __name__ == "__main__":
         elif opcion == '3':
             buscar_producto_por_codigo(gestion)
 
+        elif opcion == '4':
+            actualizar_precio_producto(gestion)
+
+        elif opcion == '5':
+            eliminar_producto_por_codigo(gestion)
+
+        elif opcion == '6':
+            mostrar_todos_los_productos(gestion)
+
         else:
             print('Opción no válida')
@@ -0,0 +1,351 @@
+'''
+Servicio HTTP/JSON local sobre GestionProductos (solo biblioteca estándar).
+
+    GET    /productos/<codigo>          leer un producto
+    POST   /productos/lote              leer varios: {"codigos": [...]}
+    GET    /productos?buscar=<texto>    buscar por nombre o proveedor
+    POST   /productos                   crear: datos del producto
+    PUT    /productos/<codigo>          actualizar precio: {"precio": ...}
+    POST   /productos/<codigo>/stock    ajustar stock: {"diferencia": ...}
+    DELETE /productos/<codigo>          eliminar
+    GET    /metrics                     contadores del servicio (JSON)
+    GET    /metrics?formato=prometheus  contadores e instrumentación del backend
+
+Las lecturas individuales concurrentes del mismo código se unen en una sola
+consulta, y las de códigos distintos se agrupan en una única llamada a
+leer_productos (un IN (...) en MySQL). Las colas son acotadas: la de
+lecturas individuales y la del resto de los trabajos (escrituras, búsquedas
+y lecturas por lote) admiten hasta --max-cola pendientes cada una; cuando se
+llenan el servicio responde 503 en lugar de acumular trabajo.
+
+Uso: python servidor.py --backend json --archivo productos_db.json [--instrumentar] [--grabar ARCHIVO]
+'''
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from backends import BACKENDS, crear_gestion
+from instrumentacion import registrar_cache, registro
+
+MAX_CUERPO = 1024 * 1024
+ESTADOS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 409: 'Conflict', 413: 'Payload Too Large',
+           500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+# Contadores del servicio que Prometheus debe ver como valores instantáneos;
+# el resto solo crece y se exporta como counter
+MEDIDORES = ('cola_lecturas', 'trabajos_pendientes', 'promedio_lote_lectura', 'segundos_activo')
+# Errores de procesar_lote que no son culpa del pedido
+ERRORES_SERVIDOR = ('Sin conexión', 'Lote descartado', 'No se pudieron guardar')
+
+
+class ServicioSaturado(Exception):
+    pass
+
+
+class ErrorHttp(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+class ServicioProductos:
+    def __init__(self, gestion, trabajadores=1, tamanio_lote=100,
+                 espera_lote=0.002, max_cola=1000):
+        self.gestion = gestion
+        self.tamanio_lote = tamanio_lote
+        self.espera_lote = espera_lote
+        self.max_cola = max_cola
+        self.executor = ThreadPoolExecutor(max_workers=trabajadores)
+        self.cola_lecturas = None
+        self._agrupador = None
+        self.en_curso = {}
+        self.trabajos_pendientes = 0
+        self.inicio = time.time()
+        self.metricas = {
+            'peticiones': 0,
+            'errores': 0,
+            'rechazadas': 0,
+            'lecturas': 0,
+            'lecturas_unidas': 0,
+            'lotes_lectura': 0,
+            'codigos_por_lote': 0,
+            'escrituras': 0,
+        }
+
+    async def iniciar(self, host='127.0.0.1', puerto=8000):
+        self.cola_lecturas = asyncio.Queue(maxsize=self.max_cola)
+        self._agrupador = asyncio.create_task(self._agrupar_lecturas())
+        return await asyncio.start_server(self._atender, host, puerto)
+
+    async def cerrar(self):
+        self._agrupador.cancel()
+        self.executor.shutdown(wait=False)
+
+    async def _en_backend(self, funcion, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, funcion, *args)
+
+    async def _en_backend_acotado(self, funcion, *args):
+        if self.trabajos_pendientes >= self.max_cola:
+            raise ServicioSaturado('Cola de trabajos llena')
+        self.trabajos_pendientes += 1
+        try:
+            return await self._en_backend(funcion, *args)
+        finally:
+            self.trabajos_pendientes -= 1
+
+    # Lecturas
+
+    async def leer(self, codigo):
+        codigo = str(codigo)
+        self.metricas['lecturas'] += 1
+        futuro = self.en_curso.get(codigo)
+        registrar_cache('lecturas_unidas', futuro is not None)
+        if futuro is not None:
+            self.metricas['lecturas_unidas'] += 1
+            return await asyncio.shield(futuro)
+
+        futuro = asyncio.get_running_loop().create_future()
+        try:
+            self.cola_lecturas.put_nowait(codigo)
+        except asyncio.QueueFull:
+            raise ServicioSaturado('Cola de lecturas llena')
+        self.en_curso[codigo] = futuro
+        return await asyncio.shield(futuro)
+
+    async def _agrupar_lecturas(self):
+        while True:
+            codigos = [await self.cola_lecturas.get()]
+            limite = time.monotonic() + self.espera_lote
+            while len(codigos) < self.tamanio_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    codigos.append(await asyncio.wait_for(
+                        self.cola_lecturas.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+
+            self.metricas['lotes_lectura'] += 1
+            self.metricas['codigos_por_lote'] += len(codigos)
+            try:
+                encontrados = await self._en_backend(
+                    self.gestion.leer_productos, codigos)
+            except Exception as e:
+                encontrados, error = None, e
+            for codigo in codigos:
+                futuro = self.en_curso.pop(codigo)
+                if futuro.done():
+                    continue
+                if encontrados is None:
+                    futuro.set_exception(error)
+                else:
+                    futuro.set_result(encontrados.get(codigo))
+
+    # Escrituras
+
+    async def operar(self, operacion):
+        self.metricas['escrituras'] += 1
+        resultado, = await self._en_backend_acotado(
+            self.gestion.procesar_lote, [operacion])
+        if not resultado['ok']:
+            if 'No se encontró' in resultado['error']:
+                estado = 404
+            elif 'ya existe' in resultado['error']:
+                estado = 409
+            elif resultado['error'].startswith(ERRORES_SERVIDOR):
+                estado = 500
+            else:
+                estado = 400
+            raise ErrorHttp(estado, resultado['error'])
+        return resultado
+
+    # HTTP
+
+    async def _despachar(self, metodo, ruta, consulta, cuerpo):
+        partes = [parte for parte in ruta.split('/') if parte]
+        if partes == ['metrics'] and metodo == 'GET':
+            if consulta.get('formato', [''])[0] == 'prometheus':
+                return 200, self.exportar_prometheus()
+            metricas = self.obtener_metricas()
+            metricas['backend'] = registro.instantanea()
+            return 200, metricas
+        if not partes or partes[0] != 'productos':
+            raise ErrorHttp(404, f'Ruta desconocida: {ruta}')
+
+        if len(partes) == 1:
+            if metodo == 'GET':
+                texto = consulta.get('buscar', [''])[0]
+                try:
+                    limite = int(consulta.get('limite', ['100'])[0])
+                except ValueError:
+                    raise ErrorHttp(400, 'El límite debe ser un número entero')
+                if limite < 0:
+                    raise ErrorHttp(400, 'El límite no puede ser negativo')
+                return 200, await self._en_backend_acotado(
+                    self.gestion.buscar_productos, texto, limite)
+            if metodo == 'POST':
+                resultado = await self.operar({'op': 'crear', 'producto': cuerpo})
+                return 201, resultado
+        elif partes[1] == 'lote':
+            if metodo == 'POST':
+                codigos = cuerpo.get('codigos', [])
+                if not isinstance(codigos, list):
+                    raise ErrorHttp(400, '"codigos" debe ser una lista')
+                codigos = [str(codigo) for codigo in codigos]
+                if len(codigos) > self.max_cola:
+                    raise ErrorHttp(413, 'Demasiados códigos en el lote')
+                return 200, await self._en_backend_acotado(
+                    self.gestion.leer_productos, codigos)
+        elif len(partes) == 2:
+            codigo = partes[1]
+            if metodo == 'GET':
+                producto = await self.leer(codigo)
+                if producto is None:
+                    raise ErrorHttp(
+                        404, f'No se encontró el producto con código: {codigo}')
+                return 200, producto
+            if metodo == 'PUT':
+                return 200, await self.operar(
+                    {'op': 'actualizar', 'codigo': codigo, 'precio': cuerpo.get('precio')})
+            if metodo == 'DELETE':
+                return 200, await self.operar({'op': 'eliminar', 'codigo': codigo})
+        elif len(partes) == 3 and partes[2] == 'stock':
+            if metodo == 'POST':
+                return 200, await self.operar(
+                    {'op': 'ajustar_stock', 'codigo': partes[1],
+                     'diferencia': cuerpo.get('diferencia')})
+        else:
+            raise ErrorHttp(404, f'Ruta desconocida: {ruta}')
+        raise ErrorHttp(405, f'Método {metodo} no permitido en {ruta}')
+
+    async def _atender(self, reader, writer):
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                metodo, destino, _ = linea.decode('latin-1').split(' ', 2)
+                cabeceras = {}
+                while True:
+                    cabecera = await reader.readline()
+                    if cabecera in (b'\r\n', b'\n', b''):
+                        break
+                    nombre, _, valor = cabecera.decode('latin-1').partition(':')
+                    cabeceras[nombre.strip().lower()] = valor.strip()
+
+                largo = int(cabeceras.get('content-length', 0))
+                seguir = cabeceras.get('connection', '').lower() != 'close'
+                if largo > MAX_CUERPO:
+                    await self._responder(writer, 413, {'error': 'Cuerpo demasiado grande'}, False)
+                    break
+                crudo = await reader.readexactly(largo) if largo else b''
+                estado, respuesta = await self._procesar(metodo, destino, crudo)
+                await self._responder(writer, estado, respuesta, seguir)
+                if not seguir:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _procesar(self, metodo, destino, crudo):
+        self.metricas['peticiones'] += 1
+        url = urlsplit(destino)
+        try:
+            try:
+                cuerpo = json.loads(crudo) if crudo else {}
+            except ValueError as e:
+                raise ErrorHttp(400, f'JSON inválido: {e}')
+            if not isinstance(cuerpo, dict):
+                raise ErrorHttp(400, 'El cuerpo debe ser un objeto JSON')
+            return await self._despachar(metodo, url.path, parse_qs(url.query), cuerpo)
+        except ServicioSaturado as e:
+            self.metricas['rechazadas'] += 1
+            return 503, {'error': str(e)}
+        except ErrorHttp as e:
+            self.metricas['errores'] += 1
+            return e.estado, {'error': str(e)}
+        except Exception as e:
+            self.metricas['errores'] += 1
+            return 500, {'error': f'Error inesperado: {e}'}
+
+    async def _responder(self, writer, estado, respuesta, seguir):
+        if isinstance(respuesta, str):
+            tipo = 'text/plain; version=0.0.4'
+            cuerpo = respuesta.encode('utf-8')
+        else:
+            tipo = 'application/json'
+            cuerpo = json.dumps(respuesta, ensure_ascii=False, default=str).encode('utf-8')
+        cabecera = (f'HTTP/1.1 {estado} {ESTADOS.get(estado, "")}\r\n'
+                    f'Content-Type: {tipo}; charset=utf-8\r\n'
+                    f'Content-Length: {len(cuerpo)}\r\n'
+                    f'Connection: {"keep-alive" if seguir else "close"}\r\n\r\n')
+        writer.write(cabecera.encode('latin-1') + cuerpo)
+        await writer.drain()
+
+    def obtener_metricas(self):
+        metricas = dict(self.metricas)
+        lotes = metricas['lotes_lectura']
+        metricas['promedio_lote_lectura'] = metricas['codigos_por_lote'] / lotes if lotes else 0.0
+        metricas['cola_lecturas'] = self.cola_lecturas.qsize()
+        metricas['trabajos_pendientes'] = self.trabajos_pendientes
+        metricas['segundos_activo'] = round(time.time() - self.inicio, 3)
+        return metricas
+
+    def exportar_prometheus(self):
+        lineas = []
+        for nombre, valor in self.obtener_metricas().items():
+            if nombre in MEDIDORES:
+                lineas.append(f'# TYPE servicio_{nombre} gauge')
+                lineas.append(f'servicio_{nombre} {valor}')
+            else:
+                lineas.append(f'# TYPE servicio_{nombre}_total counter')
+                lineas.append(f'servicio_{nombre}_total {valor}')
+        return '\n'.join(lineas) + '\n' + registro.exportar_prometheus()
+
+
+async def servir(args):
+    gestion = crear_gestion(args.backend, args.archivo, args.instrumentar, args.grabar)
+    # El backend JSON reescribe el archivo completo: un único hilo evita
+    # lecturas de un archivo a medio escribir.
+    trabajadores = args.trabajadores or (1 if args.backend == 'json' else 4)
+    servicio = ServicioProductos(
+        gestion, trabajadores, args.tamanio_lote, args.espera_lote / 1000, args.max_cola)
+    servidor = await servicio.iniciar(args.host, args.puerto)
+    print(f'Sirviendo {args.backend} en http://{args.host}:{args.puerto}')
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        await servicio.cerrar()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Servicio HTTP/JSON de gestión de productos')
+    parser.add_argument('--backend', choices=BACKENDS, default='json')
+    parser.add_argument('--archivo', default='productos_db.json')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8000)
+    parser.add_argument('--trabajadores', type=int, default=0,
+                        help='hilos para el backend (por defecto 1 en json, 4 en mysql)')
+    parser.add_argument('--tamanio-lote', type=int, default=100,
+                        help='máximo de códigos por lectura agrupada')
+    parser.add_argument('--espera-lote', type=float, default=2.0,
+                        help='milisegundos de espera para completar un lote')
+    parser.add_argument('--max-cola', type=int, default=1000)
+    parser.add_argument('--instrumentar', action='store_true',
+                        help='mide cada método del backend (ver instrumentacion.py)')
+    parser.add_argument('--grabar', metavar='ARCHIVO',
+                        help='graba las llamadas al backend en una traza (ver trazas.py)')
+    try:
+        asyncio.run(servir(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
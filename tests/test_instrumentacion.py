@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from desafio1.gestion_productos import GestionProductos
+from instrumentacion import Histograma, Registro, instrumentar
+
+
+class TestInstrumentacion(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.archivo = os.path.join(self.directorio.name, 'productos.json')
+        self.registro = Registro()
+        self.gestion = instrumentar(GestionProductos(self.archivo), self.registro)
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def test_percentiles_no_superan_el_maximo(self):
+        histograma = Histograma()
+        for segundos in (0.00003, 0.00004):
+            histograma.observar(segundos)
+        self.assertEqual(histograma.percentil(50), 0.00004)
+        histograma.observar(0.3169)
+        self.assertEqual(histograma.percentil(99), 0.3169)
+        histograma.observar(7.0)
+        self.assertEqual(histograma.percentil(99), 7.0)
+
+    def test_errores_atrapados_por_el_backend(self):
+        with open(self.archivo, 'w', encoding='utf-8') as archivo:
+            archivo.write('{corrupto')
+        with redirect_stdout(StringIO()):
+            self.gestion.leer_producto(100001)
+            self.gestion.ajustar_stock(100001, 1)
+        operaciones = self.registro.instantanea()['operaciones']
+        self.assertEqual(operaciones['leer_producto']['errores'], 1)
+        self.assertEqual(operaciones['ajustar_stock']['errores'], 1)
+        self.assertNotIn('sin_operacion', operaciones)
+
+    def test_llamadas_sin_error(self):
+        with redirect_stdout(StringIO()):
+            self.gestion.leer_producto(100001)
+        operaciones = self.registro.instantanea()['operaciones']
+        self.assertNotIn('errores', operaciones['leer_producto'])
+        etapas = operaciones['leer_producto']['etapas']
+        self.assertLessEqual(etapas['total']['p50_ms'], etapas['total']['max_ms'] + 0.001)
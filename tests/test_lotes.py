@@ -0,0 +1,122 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from desafio1.gestion_productos import GestionProductos
+from main import procesar_lotes
+
+
+def alta(codigo, nombre='Pan'):
+    return {'op': 'crear', 'producto': {'codigo': codigo, 'nombre': nombre, 'precio': 10,
+                                        'cantidad': 5, 'proveedor': 'Bimbo'}}
+
+
+class GestionContada:
+    '''Backend que registra el tamaño de cada lote recibido'''
+
+    def __init__(self, gestion):
+        self.gestion = gestion
+        self.lotes = []
+
+    def procesar_lote(self, operaciones):
+        self.lotes.append(len(operaciones))
+        return self.gestion.procesar_lote(operaciones)
+
+
+class TestProcesarLote(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.gestion = GestionProductos(os.path.join(self.directorio.name, 'productos.json'))
+        self.gestion.procesar_lote([alta(100001), alta(100002)])
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def test_una_operacion_invalida_no_afecta_al_resto(self):
+        resultados = self.gestion.procesar_lote([
+            {'op': 'ajustar_stock', 'codigo': 100001, 'diferencia': 3},
+            {'op': 'ajustar_stock', 'codigo': 100002, 'diferencia': -50},
+            {'op': 'actualizar', 'codigo': 999999, 'precio': 1},
+            {'op': 'eliminar', 'codigo': 100002},
+        ])
+        self.assertEqual([resultado['ok'] for resultado in resultados], [True, False, False, True])
+        self.assertEqual(self.gestion.leer_productos([100001, 100002]),
+                         {'100001': dict(alta(100001)['producto'], precio=10.0, cantidad=8)})
+
+    def test_falla_al_guardar_marca_las_modificaciones(self):
+        with mock.patch.object(self.gestion, '_escribir_datos', side_effect=OSError('disco lleno')):
+            resultados = self.gestion.procesar_lote([
+                {'op': 'leer', 'codigo': 100001},
+                {'op': 'ajustar_stock', 'codigo': 100001, 'diferencia': 3},
+                alta(100003),
+            ])
+        self.assertEqual([resultado['ok'] for resultado in resultados], [True, False, False])
+        self.assertIn('disco lleno', resultados[1]['error'])
+        self.assertNotIn('cantidad', resultados[1])
+        self.assertEqual(self.gestion.leer_productos([100001])['100001']['cantidad'], 5)
+
+    def test_codigo_es_texto_con_y_sin_error(self):
+        resultados = self.gestion.procesar_lote([
+            {'op': 'leer', 'codigo': 100001},
+            {'op': 'leer', 'codigo': 999999},
+            alta(100001),
+        ])
+        self.assertEqual([resultado['codigo'] for resultado in resultados],
+                         ['100001', '999999', '100001'])
+        self.assertEqual([resultado['ok'] for resultado in resultados], [True, False, False])
+
+
+class TestProcesarLotes(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.gestion = GestionContada(
+            GestionProductos(os.path.join(self.directorio.name, 'productos.json')))
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def procesar(self, lineas, tamanio_lote):
+        salida = io.StringIO()
+        total, errores = procesar_lotes(self.gestion, io.StringIO('\n'.join(lineas) + '\n'),
+                                        salida, tamanio_lote)
+        return total, errores, [json.loads(linea) for linea in salida.getvalue().splitlines()]
+
+    def test_lineas_invalidas_dan_resultados_fallidos(self):
+        total, errores, resultados = self.procesar([
+            json.dumps(alta(100001)),
+            'esto no es JSON',
+            '',
+            json.dumps([1, 2]),
+            json.dumps({'codigo': 100001}),
+            json.dumps({'op': 'leer', 'codigo': 100001}),
+        ], 10)
+        self.assertEqual((total, errores), (5, 3))
+        self.assertEqual([resultado['ok'] for resultado in resultados],
+                         [True, False, False, False, True])
+        self.assertTrue(all('Línea' in resultado['error'] for resultado in resultados[1:4]))
+        self.assertEqual(self.gestion.lotes, [2])
+
+    def test_resultados_en_el_orden_de_la_entrada(self):
+        lineas = [json.dumps(alta(100000 + indice, f'Pan {indice}')) for indice in range(7)]
+        lineas += [json.dumps({'op': 'leer', 'codigo': 100000 + indice}) for indice in (6, 0, 3)]
+        total, errores, resultados = self.procesar(lineas, 3)
+        self.assertEqual((total, errores), (10, 0))
+        self.assertEqual([resultado['codigo'] for resultado in resultados],
+                         [str(100000 + indice) for indice in (0, 1, 2, 3, 4, 5, 6, 6, 0, 3)])
+        self.assertEqual(resultados[-1]['producto']['nombre'], 'Pan 3')
+
+    def test_limites_del_tamanio_de_lote(self):
+        lineas = [json.dumps({'op': 'leer', 'codigo': 100001})] * 6
+        for tamanio_lote, lotes in ((1, [1] * 6), (3, [3, 3]), (5, [5, 1]), (6, [6]), (7, [6])):
+            self.gestion.lotes = []
+            total, _, resultados = self.procesar(lineas, tamanio_lote)
+            self.assertEqual((total, len(resultados)), (6, 6))
+            self.assertEqual(self.gestion.lotes, lotes, tamanio_lote)
+
+    def test_lote_solo_con_lineas_invalidas(self):
+        total, errores, resultados = self.procesar(['{', '{'], 1)
+        self.assertEqual((total, errores, len(resultados)), (2, 2, 2))
+        self.assertEqual(self.gestion.lotes, [])
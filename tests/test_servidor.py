@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from desafio1.gestion_productos import GestionProductos
+from servidor import ServicioProductos, ServicioSaturado
+
+
+class GestionObservada:
+    '''Backend JSON que registra las lecturas agrupadas y puede quedar bloqueado'''
+
+    def __init__(self, gestion):
+        self.gestion = gestion
+        self.lecturas = []
+        self.liberar = threading.Event()
+        self.liberar.set()
+
+    def leer_productos(self, codigos):
+        self.lecturas.append(list(codigos))
+        self.liberar.wait(5)
+        return self.gestion.leer_productos(codigos)
+
+    def buscar_productos(self, texto, limite=100):
+        self.liberar.wait(5)
+        return self.gestion.buscar_productos(texto, limite)
+
+    def __getattr__(self, nombre):
+        return getattr(self.gestion, nombre)
+
+
+class TestServicioProductos(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        gestion = GestionProductos(os.path.join(self.directorio.name, 'productos.json'))
+        gestion.procesar_lote([
+            {'op': 'crear', 'producto': {'codigo': 100000 + indice, 'nombre': f'Pan {indice}',
+                                         'precio': 10, 'cantidad': 5, 'proveedor': 'Bimbo'}}
+            for indice in range(5)])
+        self.gestion = GestionObservada(gestion)
+        self.servicio = ServicioProductos(self.gestion, espera_lote=0.05, max_cola=3)
+        self.servidor = await self.servicio.iniciar('127.0.0.1', 0)
+
+    async def asyncTearDown(self):
+        self.gestion.liberar.set()
+        self.servidor.close()
+        await self.servidor.wait_closed()
+        await self.servicio.cerrar()
+        self.directorio.cleanup()
+
+    async def test_lecturas_iguales_se_unen(self):
+        productos = await asyncio.gather(*(self.servicio.leer(100001) for _ in range(10)))
+        self.assertEqual(self.gestion.lecturas, [['100001']])
+        self.assertTrue(all(producto['nombre'] == 'Pan 1' for producto in productos))
+        self.assertEqual(self.servicio.metricas['lecturas_unidas'], 9)
+
+    async def test_lecturas_distintas_se_agrupan(self):
+        productos = await asyncio.gather(
+            self.servicio.leer(100000), self.servicio.leer(100001), self.servicio.leer(999999))
+        self.assertEqual(len(self.gestion.lecturas), 1)
+        self.assertCountEqual(self.gestion.lecturas[0], ['100000', '100001', '999999'])
+        self.assertEqual(productos[1]['codigo'], 100001)
+        self.assertIsNone(productos[2])
+
+    async def test_cola_de_lecturas_llena_responde_503(self):
+        self.gestion.liberar.clear()
+        bloqueadas = [asyncio.create_task(self.servicio.leer(100000))]
+        await asyncio.sleep(0.1)  # el agrupador queda esperando al backend
+        bloqueadas += [asyncio.create_task(self.servicio.leer(codigo))
+                       for codigo in (100001, 100002, 100003)]
+        await asyncio.sleep(0)
+        with self.assertRaises(ServicioSaturado):
+            await self.servicio.leer(100004)
+        estado, _ = await self.servicio._procesar('GET', '/productos/999999', b'')
+        self.assertEqual(estado, 503)
+
+        self.gestion.liberar.set()
+        resultados = await asyncio.gather(*bloqueadas)
+        self.assertEqual([producto['codigo'] for producto in resultados],
+                         [100000, 100001, 100002, 100003])
+
+    async def test_busquedas_acotadas_responden_503(self):
+        self.gestion.liberar.clear()
+        bloqueadas = [asyncio.create_task(self.servicio._procesar('GET', '/productos?buscar=pan', b''))
+                      for _ in range(3)]
+        await asyncio.sleep(0.05)
+        estado, _ = await self.servicio._procesar(
+            'POST', '/productos/lote', json.dumps({'codigos': [100000]}).encode())
+        self.assertEqual(estado, 503)
+        self.gestion.liberar.set()
+        for estado, productos in await asyncio.gather(*bloqueadas):
+            self.assertEqual(estado, 200)
+            self.assertEqual(len(productos), 5)
+
+    async def test_errores_del_pedido_y_del_servidor(self):
+        estado, respuesta = await self.servicio._procesar(
+            'POST', '/productos/lote', json.dumps({'codigos': 5}).encode())
+        self.assertEqual(estado, 400)
+        estado, _ = await self.servicio._procesar('GET', '/productos?limite=x', b'')
+        self.assertEqual(estado, 400)
+        estado, _ = await self.servicio._procesar('POST', '/productos', b'{no es json')
+        self.assertEqual(estado, 400)
+
+        with open(self.gestion.archivo, 'w', encoding='utf-8') as archivo:
+            archivo.write('{corrupto')
+        estado, respuesta = await self.servicio._procesar('GET', '/productos/100001', b'')
+        self.assertEqual(estado, 500)
+        self.assertIn('Error al decodificar JSON', respuesta['error'])
+        estado, _ = await self.servicio._procesar(
+            'PUT', '/productos/100001', json.dumps({'precio': 1}).encode())
+        self.assertEqual(estado, 500)
+
+    async def test_metricas_prometheus(self):
+        await self.servicio.leer(100001)
+        texto = self.servicio.exportar_prometheus()
+        self.assertIn('# TYPE servicio_lecturas_total counter\nservicio_lecturas_total 1\n', texto)
+        self.assertIn('# TYPE servicio_cola_lecturas gauge\n', texto)
+        self.assertNotIn('servicio_peticiones gauge', texto)
+
+    async def test_http(self):
+        puerto = self.servidor.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', puerto)
+        cuerpo = json.dumps({'precio': 20}).encode()
+        writer.write(b'PUT /productos/100002 HTTP/1.1\r\nContent-Length: '
+                     + str(len(cuerpo)).encode() + b'\r\n\r\n' + cuerpo)
+        writer.write(b'GET /productos/100002 HTTP/1.1\r\nConnection: close\r\n\r\n')
+        await writer.drain()
+        respuesta = (await reader.read()).decode()
+        writer.close()
+        self.assertEqual(respuesta.count('HTTP/1.1 200 OK'), 2)
+        self.assertIn('"precio": 20.0', respuesta)
+
+
+if __name__ == '__main__':
+    unittest.main()
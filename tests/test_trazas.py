@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+from benchmarks.carga import main, reproducir
+from desafio1.gestion_productos import GestionProductos, ProductoAlimenticio
+from trazas import grabar, leer_traza
+
+
+class TestTrazas(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.datos = os.path.join(self.directorio.name, 'productos.json')
+        self.traza = os.path.join(self.directorio.name, 'traza.jsonl.gz')
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def test_graba_y_reproduce_argumentos_por_nombre(self):
+        with mock.patch('trazas.atexit.register') as registrar:
+            gestion = grabar(GestionProductos(self.datos), self.traza)
+        cerrar_traza = registrar.call_args[0][0]
+        with redirect_stdout(StringIO()):
+            gestion.crear_producto(producto=ProductoAlimenticio(
+                100001, 'Pan', 10, 5, 'Bimbo',
+                (date.today() + timedelta(days=365)).strftime('%d/%m/%Y')))
+            gestion.buscar_productos('pan', limite=5)
+            gestion.leer_productos(codigos=iter([100001]))
+            gestion.ajustar_stock(100001, diferencia=3)
+        cerrar_traza()
+
+        llamadas = leer_traza(self.traza)
+        self.assertEqual([(metodo, args, kwargs) for _, metodo, args, kwargs in llamadas[1:]], [
+            ('buscar_productos', ['pan'], {'limite': 5}),
+            ('leer_productos', [], {'codigos': [100001]}),
+            ('ajustar_stock', [100001], {'diferencia': 3}),
+        ])
+        self.assertEqual(llamadas[0][3]['producto']['codigo'], 100001)
+
+        os.remove(self.datos)
+        with redirect_stderr(StringIO()):
+            informe = reproducir(llamadas, 'json', self.datos)
+        self.assertEqual(informe['errores'], 0)
+        self.assertEqual(informe['actualizaciones_perdidas'], 0)
+        self.assertEqual(GestionProductos(self.datos).leer_productos([100001])['100001']['cantidad'], 8)
+
+    def test_lee_trazas_version_1(self):
+        with open(self.datos, 'w', encoding='utf-8') as archivo:
+            archivo.write(json.dumps({'version': 1}) + '\n')
+            archivo.write(json.dumps([0.5, 'buscar_productos', ['pan', 5]]) + '\n')
+        self.assertEqual(leer_traza(self.datos), [(0.5, 'buscar_productos', ['pan', 5], {})])
+
+    def test_reproduccion_concurrente_informa_la_contencion(self):
+        gestion = GestionProductos(self.datos)
+        gestion.procesar_lote([{'op': 'crear', 'producto': {
+            'codigo': 100001, 'nombre': 'Pan', 'precio': 10, 'cantidad': 5, 'proveedor': 'Bimbo'}}])
+        llamadas = [(0.0, 'ajustar_stock', [100001, 1], {}) for _ in range(200)]
+        llamadas += [(0.0, 'leer_productos', [[100001]], {}) for _ in range(50)]
+
+        with redirect_stderr(StringIO()):
+            informe = reproducir(llamadas, 'json', self.datos, 'hilos', 4)
+        self.assertEqual(informe['concurrencia'], 4)
+        self.assertEqual(informe['llamadas'], 250)
+
+        # Cada ajuste sin error suma 1: lo que falta en el stock final se perdió
+        ajustes = informe['metodos']['ajustar_stock']
+        aplicados = ajustes['llamadas'] - ajustes['errores']
+        final = gestion.leer_productos([100001])['100001']['cantidad']
+        self.assertEqual(informe['actualizaciones_perdidas'], abs(5 + aplicados - final))
+        self.assertLessEqual(informe['lecturas_corruptas'], informe['errores'])
+
+    def test_opciones_invalidas(self):
+        for argumentos in ([self.traza, '--archivo', self.datos, '--ritmo', '0'],
+                           [self.traza, '--archivo', self.datos, '--ritmo', '-5'],
+                           [self.traza, '--backend', 'json']):
+            with redirect_stderr(StringIO()), self.assertRaises(SystemExit) as salida:
+                main(argumentos)
+            self.assertEqual(salida.exception.code, 2)
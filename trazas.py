@@ -0,0 +1,115 @@
+'''
+Grabación de trazas de llamadas a GestionProductos.
+
+grabar(gestion, archivo) envuelve los métodos públicos de una instancia y
+escribe una línea JSON por llamada:
+    [segundos desde el inicio, método, args, kwargs]
+La primera línea es una cabecera con la versión del formato. Si el archivo
+termina en .gz se comprime con gzip.
+
+Los productos creados se graban con producto_a_dict(). El backend MySQL
+asigna el código al insertar, así que sus crear_producto quedan grabados sin
+"codigo" y no se pueden reproducir sobre el backend JSON, que lo exige.
+
+Las trazas se reproducen con:
+    python -m benchmarks.carga <traza> --backend json --archivo <datos>
+'''
+import atexit
+import functools
+import gzip
+import json
+import threading
+import time
+from datetime import datetime
+
+VERSION = 2
+# Las trazas de la versión 1 no tienen kwargs
+VERSIONES_LEGIBLES = (1, 2)
+
+METODOS = ('crear_producto', 'leer_producto', 'actualizar_producto',
+           'eliminar_producto', 'ajustar_stock', 'procesar_lote',
+           'leer_productos', 'buscar_productos')
+
+
+def abrir(archivo, modo):
+    if archivo.endswith('.gz'):
+        return gzip.open(archivo, modo + 't', encoding='utf-8')
+    return open(archivo, modo, encoding='utf-8')
+
+
+def producto_a_dict(producto):
+    '''Datos del producto en el formato que aceptan los constructores de ambos backends'''
+    datos = producto.to_dict()
+    if hasattr(producto, 'fecha_vencimiento'):
+        datos['fecha_vencimiento'] = producto.fecha_vencimiento.strftime('%d/%m/%Y')
+    return datos
+
+
+class GrabadorTraza:
+    def __init__(self, archivo):
+        self._archivo = abrir(archivo, 'w')
+        self._lock = threading.Lock()
+        self._inicio = time.perf_counter()
+        self._archivo.write(json.dumps({
+            'version': VERSION,
+            'inicio': datetime.now().isoformat(timespec='seconds')
+        }) + '\n')
+
+    def registrar(self, metodo, args, kwargs):
+        linea = json.dumps([round(time.perf_counter() - self._inicio, 6), metodo, args, kwargs],
+                           ensure_ascii=False, separators=(',', ':'), default=str)
+        with self._lock:
+            if not self._archivo.closed:
+                self._archivo.write(linea + '\n')
+
+    def cerrar(self):
+        with self._lock:
+            self._archivo.close()
+
+
+def _envolver(metodo, grabador):
+    @functools.wraps(metodo)
+    def envoltura(*args, **kwargs):
+        if metodo.__name__ == 'crear_producto':
+            if args:
+                grabados = [producto_a_dict(args[0])] + list(args[1:])
+            else:
+                grabados = []
+            grabados_kw = {nombre: producto_a_dict(valor) if nombre == 'producto' else valor
+                           for nombre, valor in kwargs.items()}
+        else:
+            # Los códigos pueden llegar en un generador: se consume una sola vez
+            if metodo.__name__ == 'leer_productos':
+                if args:
+                    args = (list(args[0]),) + args[1:]
+                if 'codigos' in kwargs:
+                    kwargs['codigos'] = list(kwargs['codigos'])
+            grabados, grabados_kw = list(args), dict(kwargs)
+        grabador.registrar(metodo.__name__, grabados, grabados_kw)
+        return metodo(*args, **kwargs)
+    return envoltura
+
+
+def grabar(gestion, archivo):
+    '''Graba en `archivo` las llamadas a `gestion`. Devuelve la misma instancia.'''
+    grabador = GrabadorTraza(archivo)
+    atexit.register(grabador.cerrar)
+    for nombre in METODOS:
+        metodo = getattr(gestion, nombre, None)
+        if metodo is not None:
+            setattr(gestion, nombre, _envolver(metodo, grabador))
+    return gestion
+
+
+def leer_traza(archivo):
+    '''Devuelve la lista de llamadas (segundos, método, args, kwargs) de una traza'''
+    with abrir(archivo, 'r') as entrada:
+        cabecera = json.loads(next(entrada))
+        if cabecera.get('version') not in VERSIONES_LEGIBLES:
+            raise ValueError(f'Versión de traza no soportada: {cabecera.get("version")}')
+        llamadas = []
+        for linea in entrada:
+            if linea.strip():
+                segundos, metodo, args, *kwargs = json.loads(linea)
+                llamadas.append((segundos, metodo, args, kwargs[0] if kwargs else {}))
+        return llamadas